@@ -0,0 +1,249 @@
+import argparse
+import datetime
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from ohlc_panel import OHLCPanel
+from setup_helper import SetupLogger
+from instrumentation import metrics
+
+#===========================================
+# Historical backtest of the strategies' setups.
+# Every strategy's signal is evaluated on every bar of every ticker at once
+# (BaseStrategy.signal_panel) and each setup is simulated with the entry,
+# stop and target SetupLogger logs for it:
+#   python backtest.py --timeframe weekly
+#   python backtest.py --synthetic 500 --bars 2520 --interval 1d
+#===========================================
+
+BACKTEST_STRATEGIES = ['ZIndex', 'CCIBO', 'TheStrat']
+# strategy -> (buy label, sell label), as logged by process_data
+SETUP_LABELS = {'TheStrat': ('StratF2D', 'StratF2U')}
+RESULTS_DIR = os.path.join("reports", "backtests")
+
+ENTRY_WINDOW = 1      # bars after the setup bar in which the stop entry may trigger
+MAX_HOLD = 20         # bars a trade is held at most (exit on the close of the last one)
+CHUNK_EVENTS = 50000  # setups simulated per vectorized step, bounds the temporary arrays
+
+# trade outcomes
+NOT_TRIGGERED, TARGET, STOPPED, TIMED_OUT, OPEN = range(5)
+OUTCOMES = np.array(['not_triggered', 'target', 'stop', 'timeout', 'open'])
+
+#===========================================
+
+def _first(mask, default):
+    """Column index of the first True per row, or `default` where a row has none."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), default)
+
+def simulate_setups(panel: OHLCPanel, signal, buy, entry_window=ENTRY_WINDOW, max_hold=MAX_HOLD):
+    """
+    Simulates every setup of a (tickers x bars) signal mask.
+
+    A setup on bar i is a stop order at SetupLogger.trade_levels of bar i. It
+    fills during the next `entry_window` bars when price trades through the
+    entry (at the open if it gaps beyond it). The trade then exits at the stop
+    or at the 1R target, at the open when it gaps past them, and when a bar
+    touches both the stop is assumed first. Trades still running after
+    `max_hold` bars exit on that bar's close; trades reaching the end of the
+    data stay open. Shorts are simulated as longs on negated prices.
+
+    Returns:
+        dict: Per setup arrays 'row', 'bar', 'outcome', 'entry' (fill price),
+              'r' (result in multiples of the initial risk), 'ret' (fractional
+              return) and 'held' (bars in the trade, up to the last bar of
+              the data for open trades). Setup bars with no range
+              (high == low) have no risk and are skipped.
+    """
+    rows, bars = np.nonzero(signal)
+    sign = 1.0 if buy else -1.0
+    entry, stop, target = (sign * level for level in
+                           SetupLogger.trade_levels(panel.high[rows, bars], panel.low[rows, bars], buy))
+    high, low = (panel.high, panel.low) if buy else (-panel.low, -panel.high)
+    open_, close = sign * panel.open, sign * panel.close
+
+    with np.errstate(invalid='ignore'):
+        keep = entry - stop > 0
+    rows, bars, entry, stop, target = rows[keep], bars[keep], entry[keep], stop[keep], target[keep]
+
+    n = len(rows)
+    valid = ~np.isnan(panel.close)
+    last_col = panel.close.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    width = entry_window + max_hold
+    steps = np.arange(1, width + 1)
+    offsets = np.arange(width)
+    out = {'row': rows, 'bar': bars,
+           'outcome': np.full(n, NOT_TRIGGERED, dtype=np.int8),
+           'entry': np.full(n, np.nan), 'r': np.full(n, np.nan),
+           'ret': np.full(n, np.nan), 'held': np.zeros(n, dtype=np.int32)}
+
+    for lo in range(0, n, CHUNK_EVENTS):
+        chunk = slice(lo, lo + CHUNK_EVENTS)
+        r = rows[chunk, np.newaxis]
+        cols = bars[chunk, np.newaxis] + steps
+        inside = cols < panel.close.shape[1]
+        cols = np.minimum(cols, panel.close.shape[1] - 1)
+        h = np.where(inside, high[r, cols], np.nan)
+        l = np.where(inside, low[r, cols], np.nan)
+        o = np.where(inside, open_[r, cols], np.nan)
+        c = np.where(inside, close[r, cols], np.nan)
+        e, s, t = entry[chunk, np.newaxis], stop[chunk, np.newaxis], target[chunk, np.newaxis]
+        k = np.arange(len(cols))
+
+        with np.errstate(invalid='ignore'):
+            trigger = h[:, :entry_window] >= e
+            triggered = trigger.any(axis=1)
+            start = trigger.argmax(axis=1)
+            fill = np.fmax(o[k, start], e[:, 0])
+
+            in_trade = (offsets >= start[:, np.newaxis]) & (offsets < start[:, np.newaxis] + max_hold)
+            first_stop = _first(in_trade & (l <= s), width)
+            first_target = _first(in_trade & (h >= t), width)
+
+        last = start + max_hold - 1
+        stopped = triggered & (first_stop < width) & (first_stop <= first_target)
+        hit_target = triggered & (first_target < first_stop)
+        timed_out = triggered & ~stopped & ~hit_target & inside[k, last] & ~np.isnan(c[k, last])
+
+        # past the entry bar a gap through a level fills at the open
+        stop_price = np.where(first_stop > start, np.fmin(o[k, np.minimum(first_stop, width - 1)], s[:, 0]), s[:, 0])
+        target_price = np.where(first_target > start, np.fmax(o[k, np.minimum(first_target, width - 1)], t[:, 0]),
+                                np.fmax(t[:, 0], fill))
+        exit_price = np.select([stopped, hit_target, timed_out],
+                               [stop_price, target_price, c[k, last]], np.nan)
+        exit_bar = np.select([stopped, hit_target], [first_stop, first_target], last)
+
+        outcome = np.select([stopped, hit_target, timed_out, triggered],
+                            [STOPPED, TARGET, TIMED_OUT, OPEN], NOT_TRIGGERED)
+        out['outcome'][chunk] = outcome
+        out['entry'][chunk] = np.where(triggered, sign * fill, np.nan)
+        out['r'][chunk] = (exit_price - fill) / (e[:, 0] - s[:, 0])
+        out['ret'][chunk] = (exit_price - fill) / np.abs(fill)
+        # open trades have been held up to the ticker's last bar
+        out['held'][chunk] = np.select([outcome == OPEN, outcome >= TARGET],
+                                       [last_col[rows[chunk]] - bars[chunk] - start, exit_bar - start + 1], 0)
+    return out
+
+#===========================================
+
+def summarize(trades: pd.DataFrame):
+    """
+    Returns:
+        pd.DataFrame: One row per (strategy, setup, side) with the setup count, fill
+                      rate, win rate, expectancy (mean R), average win/loss
+                      in R, mean return and mean holding time of closed trades.
+    """
+    rows = []
+    for (strategy, setup, side), group in trades.groupby(['strategy', 'setup', 'side'], sort=False):
+        closed = group[group['outcome'].isin(['target', 'stop', 'timeout'])]
+        wins, losses = closed[closed['r'] > 0], closed[closed['r'] <= 0]
+        rows.append({
+            'strategy': strategy,
+            'setup': setup,
+            'side': side,
+            'setups': len(group),
+            'fill_rate': (group['outcome'] != 'not_triggered').mean(),
+            'closed': len(closed),
+            'open': int((group['outcome'] == 'open').sum()),
+            'win_rate': (closed['r'] > 0).mean() if len(closed) else np.nan,
+            'expectancy_r': closed['r'].mean(),
+            'avg_win_r': wins['r'].mean(),
+            'avg_loss_r': losses['r'].mean(),
+            'profit_factor': wins['r'].sum() / -losses['r'].sum() if losses['r'].sum() < 0 else np.nan,
+            'mean_return': closed['ret'].mean(),
+            'mean_bars_held': closed['held'].mean(),
+            'stop_rate': (closed['outcome'] == 'stop').mean() if len(closed) else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+#===========================================
+
+def run_backtest(data, strategies=None, entry_window=ENTRY_WINDOW, max_hold=MAX_HOLD):
+    """
+    Backtests the strategies over the whole history of every ticker.
+
+    Args:
+        data (list or OHLCPanel): (ticker, pd.DataFrame) tuples, or a panel.
+        strategies (list, optional): Strategy descriptions. Defaults to BACKTEST_STRATEGIES.
+        entry_window (int, optional): Bars a setup may take to trigger.
+        max_hold (int, optional): Bars a trade is held at most.
+
+    Returns:
+        tuple: (summary, trades) DataFrames; trades has one row per setup.
+    """
+    from st_strategy_factory import StrategyFactory
+
+    panel = data if isinstance(data, OHLCPanel) else OHLCPanel.from_frames(data)
+    tickers = np.asarray(panel.tickers, dtype=object)
+    frames = []
+    for description in strategies or BACKTEST_STRATEGIES:
+        strat = StrategyFactory.get_instance_by_description(description)
+        labels = SETUP_LABELS.get(description, (str(strat), str(strat)))
+        with metrics.span(f"backtest.{description}"):
+            buy, sell = strat.signal_panel(panel)
+            for side, signal, label in (('buy', buy, labels[0]), ('sell', sell, labels[1])):
+                sim = simulate_setups(panel, signal, side == 'buy', entry_window, max_hold)
+                frames.append(pd.DataFrame({
+                    'strategy': description,
+                    'setup': label,
+                    'side': side,
+                    'ticker': tickers[sim['row']],
+                    'date': panel.dates[sim['bar']],
+                    'outcome': OUTCOMES[sim['outcome']],
+                    'entry': sim['entry'],
+                    'r': sim['r'],
+                    'ret': sim['ret'],
+                    'held': sim['held'],
+                }))
+
+    trades = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return summarize(trades), trades
+
+#===========================================
+
+def print_summary(summary: pd.DataFrame):
+    print("\n--- Backtest ---")
+    for row in summary.itertuples(index=False):
+        print(f"  {row.strategy:<9} {row.setup:<9} {row.side:<4} {row.setups:8d} setups  fill {row.fill_rate:6.1%}  win {row.win_rate:6.1%}  "
+              f"exp {row.expectancy_r:+.3f}R  pf {row.profit_factor:5.2f}  held {row.mean_bars_held:5.1f} bars")
+
+#===========================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SYJ_TA strategy backtest")
+    parser.add_argument('--strategies', nargs='*', default=BACKTEST_STRATEGIES)
+    parser.add_argument('--timeframe', default='weekly', help="daily, weekly, monthly or quarterly")
+    parser.add_argument('--entry-window', type=int, default=ENTRY_WINDOW)
+    parser.add_argument('--max-hold', type=int, default=MAX_HOLD)
+    parser.add_argument('--synthetic', type=int, default=None, metavar='TICKERS',
+                        help="backtest a synthetic universe instead of the stored data")
+    parser.add_argument('--bars', type=int, default=2520, help="bars per synthetic ticker")
+    parser.add_argument('--interval', default='1d', help="bar interval of the synthetic universe")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trades', action='store_true', help="also save every simulated setup")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    if args.synthetic:
+        from benchmark import synthetic_universe
+        data = synthetic_universe(args.synthetic, args.bars, args.seed, interval=args.interval)
+        source = f"synthetic_{args.synthetic}x{args.bars}"
+    else:
+        from data_manager import DataManager
+        data = DataManager().get_timeframe_data(args.timeframe)
+        source = args.timeframe
+    load_time = time.perf_counter() - start_time
+
+    summary, trades = run_backtest(data, args.strategies, args.entry_window, args.max_hold)
+    print_summary(summary)
+    print(f"\n{len(trades)} setups on {len(data)} tickers backtested in "
+          f"{time.perf_counter() - start_time - load_time:.2f}s (data loaded in {load_time:.2f}s)")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    base = os.path.join(RESULTS_DIR, f"backtest_{source}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    summary.to_csv(base + ".csv", index=False)
+    if args.trades:
+        trades.to_csv(base + "_trades.csv", index=False)
+    print(f"Saved backtest results to {base}.csv")
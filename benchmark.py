@@ -0,0 +1,308 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from download_pool import synthetic_frame
+from data_store import OHLCStore, LongOHLCStore
+
+#===========================================
+# Reproducible benchmarks of the hot paths on synthetic OHLC universes.
+# No network is used. Every run writes a JSON file so results can be
+# compared across commits:
+#   python benchmark.py --tickers 500 --bars 104
+#   python benchmark.py --compare reports/benchmarks/<older run>.json
+#===========================================
+
+BENCH_END_DATE = "2024-12-30"  # fixed last bar, so a seed always gives the same universe
+RESULTS_DIR = os.path.join("reports", "benchmarks")
+
+#===========================================
+
+def synthetic_universe(tickers=500, bars=104, seed=0, interval="1wk"):
+    """
+    Returns:
+        list: (ticker, pd.DataFrame) tuples of `tickers` synthetic histories with
+              `bars` bars each, identical for identical arguments.
+    """
+    return [(f"SYN{i:04d}", synthetic_frame(f"SYN{i:04d}", bars, interval, end=BENCH_END_DATE, seed=seed))
+            for i in range(tickers)]
+
+#===========================================
+
+def _bench_strat_codes(universe, workdir):
+    from st_thestrat import TheStrat
+    strat = TheStrat()
+    for _, df in universe:
+        strat.assign_strat_codes(df.copy())
+
+def _bench_zindex(universe, workdir):
+    from st_zindex import ZIndex
+    strat = ZIndex()
+    for _, df in universe:
+        # ticker=None bypasses the indicator cache, so every run computes
+        strat._calculate_zi_params(df, None)
+
+def _bench_cci(universe, workdir):
+    from st_cci_bo import CCIBO
+    strat = CCIBO()
+    for _, df in universe:
+        strat._calculate_cci_params(df.copy(), None)
+
+def _store_bench(store_cls, name):
+    """Returns (save, load) benchmarks for a store class. load writes its database on the warm-up run."""
+    def save(universe, workdir):
+        path = os.path.join(workdir, f"{name}.db")
+        if os.path.exists(path):
+            os.remove(path)
+        store_cls(path).save(universe)
+
+    def load(universe, workdir):
+        path = os.path.join(workdir, f"{name}_load.db")
+        if not os.path.exists(path):
+            store_cls(path).save(universe)
+        store_cls(path).load()
+    return save, load
+
+def _bench_chart_render(universe, workdir):
+    from chart_renderer import ChartJob, ChartRenderer
+    from st_zindex import ZIndex
+    strat = ZIndex()
+    jobs = [ChartJob(ZIndex._plot_zi_chart, ticker, 'Buy', strat.evaluate(None, df)) for ticker, df in universe]
+    cache_dir = ChartRenderer.CACHE_DIR
+    ChartRenderer.CACHE_DIR = None  # measure rendering, not the page cache
+    try:
+        ChartRenderer.render_pdf(jobs, os.path.join(workdir, "charts.pdf"))
+    finally:
+        ChartRenderer.CACHE_DIR = cache_dir
+
+def _bench_backtest(universe, workdir):
+    from backtest import run_backtest
+    run_backtest(universe)
+
+_save_tables, _load_tables = _store_bench(OHLCStore, "tables")
+_save_long, _load_long = _store_bench(LongOHLCStore, "long")
+
+# name -> (function(universe, workdir), uses the chart subset of the universe)
+BENCHMARKS = {
+    'assign_strat_codes': (_bench_strat_codes, False),
+    'calculate_zi_params': (_bench_zindex, False),
+    'calculate_cci_params': (_bench_cci, False),
+    'store_save_tables': (_save_tables, False),
+    'store_load_tables': (_load_tables, False),
+    'store_save_long': (_save_long, False),
+    'store_load_long': (_load_long, False),
+    'chart_render': (_bench_chart_render, True),
+    'backtest': (_bench_backtest, False),
+}
+# benchmarks doing their work in worker processes, which tracemalloc does not see
+WORKER_BENCHMARKS = {'chart_render'}
+
+#===========================================
+
+class _WorkerPeakSampler(threading.Thread):
+    """
+    Polls the peak RSS (VmHWM in /proc) of every descendant process while
+    running, so memory used by process pools is measured as well. Linux only;
+    `available` is False elsewhere.
+    """
+    INTERVAL = 0.05
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.available = os.path.isdir(f"/proc/{os.getpid()}")
+        self.peaks = {}  # pid -> peak RSS in bytes
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self._sample()
+            self._stop_event.wait(self.INTERVAL)
+        self._sample()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return sum(self.peaks.values())
+
+    def _sample(self):
+        parents = {}
+        for name in os.listdir("/proc"):
+            if name.isdigit():
+                try:
+                    with open(f"/proc/{name}/stat", 'r') as f:
+                        # the command name may contain spaces; ppid follows the ')'
+                        parents[int(name)] = int(f.read().rsplit(')', 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    continue
+        descendants, frontier = set(), {os.getpid()}
+        while frontier:
+            frontier = {pid for pid, ppid in parents.items() if ppid in frontier} - descendants
+            descendants |= frontier
+        for pid in descendants:
+            try:
+                with open(f"/proc/{pid}/status", 'r') as f:
+                    for line in f:
+                        if line.startswith("VmHWM:"):
+                            self.peaks[pid] = max(self.peaks.get(pid, 0), int(line.split()[1]) * 1024)
+                            break
+            except OSError:
+                continue
+
+#===========================================
+
+def run_benchmark(name, universe, workdir, repeat=3):
+    """
+    Times one benchmark: a warm-up run, `repeat` timed runs and one run under
+    tracemalloc for the peak traced (Python and numpy) memory of this process.
+    WORKER_BENCHMARKS get one more run measuring the summed peak RSS of the
+    worker processes ('workers_peak_mb'; None where it cannot be measured).
+
+    Returns:
+        dict: The benchmark's result record.
+    """
+    func, _ = BENCHMARKS[name]
+    func(universe, workdir)
+
+    times = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        func(universe, workdir)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func(universe, workdir)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    workers_peak = None
+    if name in WORKER_BENCHMARKS:
+        sampler = _WorkerPeakSampler()
+        if sampler.available:
+            sampler.start()
+            try:
+                func(universe, workdir)
+            finally:
+                workers_peak = sampler.stop()
+
+    best = min(times)
+    return {
+        'name': name,
+        'tickers': len(universe),
+        'bars': int(np.mean([len(df) for _, df in universe])) if universe else 0,
+        'best_s': round(best, 6),
+        'mean_s': round(float(np.mean(times)), 6),
+        'tickers_per_s': round(len(universe) / best, 2) if best > 0 else None,
+        'peak_mb': round(peak / (1024 * 1024), 3),
+        'workers_peak_mb': round(workers_peak / (1024 * 1024), 3) if workers_peak is not None else None,
+    }
+
+#===========================================
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def run_suite(tickers=500, bars=104, seed=0, repeat=3, charts=20, only=None, output=None):
+    """
+    Runs the benchmarks and saves the results as JSON.
+
+    Args:
+        tickers (int): Universe size.
+        bars (int): Bars per ticker.
+        seed (int): Universe seed.
+        repeat (int): Timed runs per benchmark (the best one is reported).
+        charts (int): Number of charts rendered by the chart benchmark.
+        only (list, optional): Benchmark names to run. Defaults to all.
+        output (str, optional): JSON path. Defaults to reports/benchmarks/bench_<commit>_<time>.json.
+
+    Returns:
+        dict: The saved report.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+
+    universe = synthetic_universe(tickers, bars, seed)
+    names = only or list(BENCHMARKS)
+    workdir = tempfile.mkdtemp(prefix="syj_bench_")
+    results = []
+    try:
+        for name in names:
+            subset = universe[:charts] if BENCHMARKS[name][1] else universe
+            print(f"running {name} ({len(subset)} tickers x {bars} bars)...")
+            results.append(run_benchmark(name, subset, workdir, repeat))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = _git_commit()
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': stamp,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'config': {'tickers': tickers, 'bars': bars, 'seed': seed, 'repeat': repeat, 'charts': charts},
+        },
+        'results': results,
+    }
+
+    output = output or os.path.join(RESULTS_DIR, f"bench_{commit or 'nogit'}_{stamp}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"Saved benchmark results to {output}")
+    return report
+
+#===========================================
+
+def print_report(report, baseline=None):
+    """Prints the results, with the speedup against a baseline report when given."""
+    base = {r['name']: r for r in baseline['results']} if baseline else {}
+    print(f"\n--- Benchmarks ({report['meta']['commit']}) ---")
+    for r in report['results']:
+        line = f"  {r['name']:<22} {r['best_s']:9.4f}s {r['tickers_per_s'] or 0:11.1f} tickers/s {r['peak_mb']:9.2f} MB"
+        if r.get('workers_peak_mb') is not None:
+            line += f" (+{r['workers_peak_mb']:.1f} MB in workers)"
+        if r['name'] in base and r['best_s'] > 0:
+            line += f"   x{base[r['name']]['best_s'] / r['best_s']:.2f} vs {baseline['meta']['commit']}"
+        print(line)
+
+#===========================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SYJ_TA benchmarks on synthetic data")
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--bars', type=int, default=104)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--charts', type=int, default=20, help="charts rendered by the chart benchmark")
+    parser.add_argument('--only', nargs='*', choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument('--output', default=None, help="JSON output path")
+    parser.add_argument('--compare', default=None, help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    report = run_suite(args.tickers, args.bars, args.seed, args.repeat, args.charts, args.only, args.output)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_report(report, json.load(f))
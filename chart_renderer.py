@@ -0,0 +1,296 @@
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Callable
+
+import pandas as pd
+from instrumentation import metrics
+
+#===========================================
+
+@dataclass
+class ChartJob:
+    """One chart page: plot(ticker, setup, df) must return a matplotlib figure."""
+    plot: Callable
+    ticker: str
+    setup: str
+    df: pd.DataFrame
+
+#===========================================
+
+class ChartRenderer:
+    """
+    Renders collected chart jobs into a multi-page PDF.
+
+    Strategies hand their setups over as ChartJobs, either all at once via
+    render_pdf or one by one while scanning via ChartStream. Pages are rendered
+    in a process pool (Agg backend) to one PDF file per page and merged in job
+    order, so the report layout is stable no matter which page finishes first.
+
+    Rendered pages are kept in a ChartCache, so a re-run only renders the
+    charts whose data or plotting code changed.
+
+    Merging needs the optional `pypdf` package; without it charts are rendered
+    in-process straight into PdfPages (no cache). A single core or only a few
+    pages to render also skip the pool.
+    """
+    MIN_PARALLEL_JOBS = 4
+    MAX_WORKERS = None  # None = os.cpu_count()
+    CACHE_DIR = os.path.join("data", "chart_cache")  # None disables the page cache
+    CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+    @staticmethod
+    def render_pdf(jobs, pdf_path):
+        with ChartStream() as charts:
+            for job in jobs:
+                charts.add(pdf_path, job)
+
+    #===========================================
+
+    @staticmethod
+    def _render_inline(jobs, pdf_path):
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
+        with PdfPages(pdf_path) as pdf:
+            for job in jobs:
+                img = job.plot(job.ticker, job.setup, job.df)
+                pdf.savefig(img)
+                plt.close(img)
+
+#===========================================
+
+class ChartStream:
+    """
+    Renders chart pages while the strategy is still scanning.
+
+    Jobs are added per output PDF as setups are found. Cached pages are reused;
+    the others are handed to a process pool as soon as MIN_PARALLEL_JOBS are
+    waiting (fewer are rendered in-process on close), so rendering overlaps
+    with the scan. close() waits for the pages and writes every PDF with its
+    pages in the order they were added. Used as a context manager.
+
+    A page's data is only held until the page is rendered: at most
+    MIN_PARALLEL_JOBS pages wait for a worker and a few per worker are queued,
+    so a long scan does not keep every charted frame in memory.
+    """
+    PENDING_PER_WORKER = 2
+
+    def __init__(self):
+        try:
+            from pypdf import PdfWriter
+        except ImportError:
+            PdfWriter = None
+        self._writer_cls = PdfWriter
+        self._cache = None
+        if PdfWriter and ChartRenderer.CACHE_DIR:
+            self._cache = ChartCache(ChartRenderer.CACHE_DIR, ChartRenderer.CACHE_MAX_BYTES)
+        self._page_dir = None
+        self._pdfs = {}         # pdf_path -> [page path], or [job] without pypdf
+        self._scheduled = set() # page paths being rendered in this run
+        self._waiting = []      # (job, page path) not handed out yet
+        self._futures = []      # (page path, future)
+        self._failed = set()
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._shutdown()
+
+    #===========================================
+
+    def add(self, pdf_path, job):
+        pages = self._pdfs.setdefault(pdf_path, [])
+        if self._writer_cls is None:
+            pages.append(job)
+            return
+
+        if self._cache:
+            path = self._cache.path_for(job)
+        else:
+            if self._page_dir is None:
+                self._page_dir = tempfile.mkdtemp(prefix="chart_pages_")
+            path = os.path.join(self._page_dir, f"page_{sum(map(len, self._pdfs.values())):05d}.pdf")
+        pages.append(path)
+
+        # only pages that are not cached (or already queued) get rendered
+        if path in self._scheduled:
+            return
+        if os.path.exists(path):
+            metrics.count('charts.cached')
+            return
+        metrics.count('charts.rendered')
+        self._scheduled.add(path)
+        self._waiting.append((job, path))
+        self._dispatch()
+
+    def _dispatch(self, final=False):
+        workers = ChartRenderer.MAX_WORKERS or os.cpu_count() or 1
+        batch_full = len(self._waiting) >= ChartRenderer.MIN_PARALLEL_JOBS
+        if self._pool is None and workers >= 2 and batch_full:
+            # the scan may still be loading data on other threads; forking those is unsafe
+            context = multiprocessing.get_context(
+                'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else None)
+            self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                                             mp_context=context)
+        if self._pool is not None:
+            for job, path in self._waiting:
+                self._futures.append((path, self._pool.submit(_render_page, job, path)))
+            self._waiting = []
+            # queued pages hold their data until a worker takes them; let the workers catch up
+            pending = [future for _, future in self._futures if not future.done()]
+            if len(pending) > self.PENDING_PER_WORKER * workers:
+                wait(pending, return_when=FIRST_COMPLETED)
+        elif final or batch_full:
+            for job, path in self._waiting:
+                with metrics.span('render.page', job.ticker):
+                    if _render_page(job, path) is None:
+                        self._failed.add(path)
+            self._waiting = []
+
+    #===========================================
+
+    def close(self):
+        try:
+            if self._writer_cls is None:
+                for pdf_path, pages in self._pdfs.items():
+                    ChartRenderer._render_inline(pages, pdf_path)
+                return
+
+            self._dispatch(final=True)
+            with metrics.span('render.wait'):
+                for path, future in self._futures:
+                    try:
+                        ok = future.result() is not None
+                    except Exception as e:
+                        print(f"Error rendering chart page {path}: {e}")
+                        ok = False
+                    if not ok:
+                        self._failed.add(path)
+
+            for pdf_path, pages in self._pdfs.items():
+                with metrics.span('render.merge'):
+                    writer = self._writer_cls()
+                    for path in pages:
+                        if path not in self._failed and os.path.exists(path):
+                            writer.append(path)
+                    with open(pdf_path, 'wb') as f:
+                        writer.write(f)
+                rendered = len(set(pages) & self._scheduled)
+                print(f"Wrote {len(pages)} charts into {pdf_path} ({rendered} rendered, {len(pages) - rendered} cached)")
+
+            if self._cache:
+                self._cache.touch([path for pages in self._pdfs.values() for path in pages])
+                self._cache.evict()
+        finally:
+            self._shutdown()
+
+    def _shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._page_dir:
+            shutil.rmtree(self._page_dir, ignore_errors=True)
+            self._page_dir = None
+
+#===========================================
+
+class ChartCache:
+    """
+    Content-addressed store of rendered chart pages.
+
+    A page is keyed by a hash of the plot function (name, bytecode, constants
+    and names, including nested functions), ticker, setup and the plotted DataFrame, so identical charts are never rendered
+    twice. Once the cache grows beyond max_bytes the least recently used pages
+    are deleted.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, job):
+        h = hashlib.sha256()
+        h.update(f"{job.plot.__module__}.{job.plot.__qualname__}|{job.ticker}|{job.setup}".encode())
+        self._hash_code_(h, job.plot.__code__)
+        h.update("|".join(map(str, job.df.columns)).encode())
+        # the same bars may come with a different index unit or int/float volume
+        # (fresh download vs. store), which must not change the key
+        df = job.df
+        if isinstance(df.index, pd.DatetimeIndex):
+            df = df.set_axis(df.index.as_unit('ns'))
+        numeric = df.select_dtypes('number').columns
+        df = df.astype({col: 'float64' for col in numeric})
+        h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+        return h.hexdigest()
+
+    @classmethod
+    def _hash_code_(cls, h, code):
+        # co_code only holds indexes into co_consts/co_names, so a changed color,
+        # figscale or title string needs the constants themselves in the key
+        h.update(code.co_code)
+        h.update("|".join(code.co_names).encode())
+        for const in code.co_consts:
+            if hasattr(const, 'co_code'):
+                cls._hash_code_(h, const)
+            elif isinstance(const, frozenset):
+                # set literals: repr order depends on the per-process string hash seed
+                h.update(repr(sorted(map(repr, const))).encode())
+            else:
+                h.update(f"{type(const).__name__}:{const!r}|".encode())
+
+    def path_for(self, job):
+        return os.path.join(self.cache_dir, f"{self.key(job)}.pdf")
+
+    def touch(self, paths):
+        for path in paths:
+            if os.path.exists(path):
+                os.utime(path)
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".pdf") and os.path.isfile(path):
+                st = os.stat(path)
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError as e:
+                print(f"Error evicting cached chart {path}: {e}")
+
+#===========================================
+
+def _init_render_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _render_page(job, path):
+    """Renders one job to its own PDF file. Returns the path, or None on failure."""
+    import matplotlib.pyplot as plt
+    try:
+        img = job.plot(job.ticker, job.setup, job.df)
+        # write under a temporary name so an interrupted run never leaves a broken cached page
+        img.savefig(path + ".tmp", format='pdf')
+        plt.close(img)
+        os.replace(path + ".tmp", path)
+        return path
+    except Exception as e:
+        print(f"Error rendering chart for {job.ticker}: {e}")
+        return None
+
+#===========================================
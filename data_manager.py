@@ -1,17 +1,69 @@
 import os
 import pandas as pd
 from download_helper import DataDownloader
+from download_pool import ConcurrentDownloader
+from data_store import OHLCStore, LongOHLCStore, YearlyStatsIndex, to_utc_index, compact_frame
+from panel_cache import PanelCache
+from ohlc_panel import OHLCPanel
+from timeframes import TIMEFRAMES, update_resampled, span_start
+import pipeline
+from instrumentation import metrics
 import utility 
 import re
+import datetime
 
 
 
 class DataManager:
-    def __init__(self, ticker_filepath="data/sp500_tickers.json"):
+    DOWNLOAD_BATCH_SIZE = 100
+    DOWNLOAD_WORKERS = 8
+    REQUESTS_PER_SECOND = 5.0
+    # store backend -> (store class, db filename per timeframe)
+    STORE_BACKENDS = {
+        'long': (LongOHLCStore, "{timeframe}_ohlc.db"),
+        'tables': (OHLCStore, "{timeframe}_data.db"),
+    }
+    WEEKLY_PANEL_DIR = os.path.join(".", DataDownloader.DATA_DIR, "weekly_panel")
+    # only daily bars are downloaded; weekly/monthly/quarterly bars are resampled from them
+    HISTORY_SPAN = '2y'
+    # market data provider used when none is passed in (None: DataDownloader, i.e. yfinance)
+    PROVIDER = None
+    # chunked mode (iter_shards): tickers per shard, and the working memory of a
+    # ticker while it is being processed as a multiple of the size of its bars.
+    # With a memory budget the first shard is a probe of PROBE_SHARD_SIZE tickers
+    # that measures the bytes per ticker before any full shard is loaded.
+    SHARD_SIZE = 250
+    MEMORY_OVERHEAD = 4.0
+    PROBE_SHARD_SIZE = 10
+    # hand out compact frames (see data_store.compact_frame) unless told otherwise
+    COMPACT = False
+
+    def __init__(self, ticker_filepath="data/sp500_tickers.json", bulk_download=True, store='long',
+                 panel_cache=False, provider=None, compact=None):
         print("DataManager initializing.")
+        # weekly/monthly/quarterly (and sharded) bars are kept compact; the daily
+        # bars stay complete since everything is resampled from them
+        self._compact = self.COMPACT if compact is None else compact
         self._ticker_filepath = ticker_filepath
-        self.weekly_db_path = os.path.join(".", DataDownloader.DATA_DIR, f"weekly_data_{utility.get_date_mmddyyyy()}.db")
+        self._bulk_download = bulk_download
+        self._provider = provider or self.PROVIDER or DataDownloader()
+        store_cls, db_name = self.STORE_BACKENDS[store]
+        self.weekly_db_path = os.path.join(".", DataDownloader.DATA_DIR, db_name.format(timeframe="weekly"))
+        self.daily_db_path = os.path.join(".", DataDownloader.DATA_DIR, db_name.format(timeframe="daily"))
+        self._store_cls, self._db_name = store_cls, db_name
+        self._daily_store = store_cls(self.daily_db_path)
+        # resampled bars are cached per timeframe in stores of the same backend
+        self._weekly_store = store_cls(self.weekly_db_path)
+        self._timeframe_stores = {'weekly': self._weekly_store}
+        # optional memory-mapped copy of the weekly store for fast warm starts
+        self._weekly_panel = PanelCache(self.WEEKLY_PANEL_DIR) if panel_cache else None
+        self._yearly_index = YearlyStatsIndex(os.path.join(".", DataDownloader.DATA_DIR, "yearly_stats.db"))
         self._weeklydata_ = []
+        self._weeklypanel_ = None
+        self._dailydata_ = []
+        self._dailypanel_ = None
+        self._resampled_ = {}
+        self._failed_downloads_ = []
         self._initialize_tickers()
         print(len(self._tickers_))
         self._check_and_update_data_files()
@@ -24,42 +76,307 @@ class DataManager:
 
         return self._weeklydata_
 
-    def get_daily_data(self):
+    def attach_weekly_panel(self, cache_dir=None):
+        """
+        Serves weekly data from an already written PanelCache instead of the store,
+        e.g. in worker processes that share the data loaded once by the launcher.
+        """
+        panel = PanelCache(cache_dir or self.WEEKLY_PANEL_DIR)
+        if not panel.open():
+            raise FileNotFoundError(f"No panel cache found at {panel.cache_dir}")
+        self._weeklydata_ = panel.items(self._tickers_)
+        self._weeklypanel_ = None
+        print(f"Attached {len(self._weeklydata_)} tickers from panel cache {panel.cache_dir}")
+
+    def get_weekly_panel(self, span='2y'):
+        """
+        Returns the weekly data as an OHLCPanel of aligned (tickers x bars) arrays.
+        """
+        if self._weeklypanel_ is None:
+            self._weeklypanel_ = OHLCPanel.from_frames(self.get_weekly_data(span))
+        return self._weeklypanel_
+
+    def get_daily_data(self, span=None):
         if not self._dailydata_:
             self._prepare_daily_data_()
 
-        return self._weeklydata_
+        return self._trim_span_(self._dailydata_, span)
+
+    def get_daily_panel(self):
+        """
+        Returns the daily data as an OHLCPanel of aligned (tickers x bars) arrays.
+        """
+        if self._dailypanel_ is None:
+            self._dailypanel_ = OHLCPanel.from_frames(self.get_daily_data())
+        return self._dailypanel_
+
+    def get_monthly_data(self, span=None):
+        return self.get_timeframe_data('monthly', span)
+
+    def get_quarterly_data(self, span=None):
+        return self.get_timeframe_data('quarterly', span)
+
+    def get_timeframe_data(self, timeframe, span=None):
+        """
+        Returns bars of any timeframe, all derived from the one local daily store.
+
+        Args:
+            timeframe (str): 'daily' or one of timeframes.TIMEFRAMES
+                             ('weekly', 'monthly', 'quarterly').
+            span (str, optional): Only return bars within this yfinance style
+                                  span (e.g. '1y'). Defaults to the whole
+                                  local history (HISTORY_SPAN).
+
+        Returns:
+            list: A list of (ticker, pd.DataFrame) tuples in ticker order.
+        """
+        if timeframe == 'daily':
+            return self.get_daily_data(span)
+        if timeframe not in TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe: {timeframe}")
+        if timeframe not in self._resampled_:
+            self._resampled_[timeframe] = self._prepare_resampled_(timeframe)
+        return self._trim_span_(self._resampled_[timeframe], span)
+
+    #===========================================
+
+    def stream_weekly_data(self, span='2y', prefetch=64):
+        """
+        Streaming version of get_weekly_data, see stream_timeframe_data.
+        Once the stream has been consumed to the end the complete list is kept
+        (and the panel cache written), as with get_weekly_data.
+        """
+        today = utility.get_date_mmddyyyy()
+        if not self._weeklydata_ and self._weekly_panel and self._weekly_panel.stamp() == today:
+            self._prepare_weekly_data_(span)
+        if self._weeklydata_:
+            yield from self._weeklydata_
+            return
+
+        data = {}
+        for ticker, df in self.stream_timeframe_data('weekly', span, prefetch):
+            data[ticker] = df
+            yield ticker, df
+        self._weeklydata_ = [(ticker, data[ticker]) for ticker in self._tickers_ if ticker in data]
+        if self._weekly_panel:
+            self._weekly_panel.write(self._weeklydata_, stamp=today)
+
+    def stream_timeframe_data(self, timeframe='weekly', span=None, prefetch=64):
+        """
+        Yields (ticker, df) for every ticker as soon as its bars are available,
+        instead of returning after the whole universe has been loaded.
+
+        Loading, downloading and resampling run on a background thread, so the
+        caller's per-ticker work overlaps with the I/O. At most `prefetch`
+        tickers wait to be consumed; beyond that the loader and the downloads
+        pause. Tickers come in ticker order when served locally and in arrival
+        order when they are being downloaded.
+
+        Args:
+            timeframe (str): 'daily' or one of timeframes.TIMEFRAMES.
+            span (str, optional): Only yield bars within this span (e.g. '1y').
+            prefetch (int, optional): Maximum number of tickers waiting to be consumed.
+        """
+        if timeframe == 'daily':
+            source = self._iter_daily_()
+        elif timeframe in TIMEFRAMES:
+            source = self._iter_timeframe_(timeframe)
+        else:
+            raise ValueError(f"Unknown timeframe: {timeframe}")
+
+        start = span_start(span)
+        for ticker, df in pipeline.prefetch(source, prefetch):
+            yield ticker, (df if start is None else df[df.index >= start])
     
+    #===========================================
+
+    def iter_shards(self, timeframe='weekly', span=None, shard_size=None, memory_budget_mb=None):
+        """
+        Yields the universe in shards: lists of at most shard_size (ticker, df)
+        tuples, in ticker order.
+
+        Every shard is loaded, refreshed and resampled on its own, straight from
+        the stores, and nothing of it is kept once the caller asks for the next
+        one, so memory depends on the shard size instead of the universe size
+        and the history span. With a memory budget the shard size adapts: the
+        first shard is a probe of PROBE_SHARD_SIZE tickers, and after every
+        shard the bytes loaded per ticker are measured and the next shard gets
+        as many tickers as fit in the budget (MEMORY_OVERHEAD times their bars
+        each). The stores are marked as refreshed once the last shard is done.
+
+        Args:
+            timeframe (str): 'daily' or one of timeframes.TIMEFRAMES.
+            span (str, optional): Only yield bars within this span (e.g. '1y').
+            shard_size (int, optional): Tickers per shard. Defaults to SHARD_SIZE,
+                                        or to what the budget allows.
+            memory_budget_mb (float, optional): Working memory allowed per shard.
+        """
+        if timeframe != 'daily' and timeframe not in TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe: {timeframe}")
+        size = max(1, int(shard_size or self.SHARD_SIZE))
+        if memory_budget_mb:
+            # nothing is known about the bars yet: measure a few tickers first
+            size = min(size, max(1, int(self.PROBE_SHARD_SIZE)))
+        start = span_start(span)
+        tickers = list(self._tickers_)
+        pos = 0
+        while pos < len(tickers):
+            shard_tickers = tickers[pos:pos + size]
+            pos += len(shard_tickers)
+            loaded = [0]
+
+            def measured(source):
+                for ticker, df in source:
+                    loaded[0] += int(df.memory_usage(index=True).sum())
+                    yield ticker, df
+
+            daily = measured(self._iter_load_and_refresh_(self._daily_store, span=self.HISTORY_SPAN,
+                                                          interval="1d", tickers=shard_tickers))
+            if timeframe == 'daily':
+                data = dict(daily)
+            else:
+                data = dict(measured(self._iter_resampled_(timeframe, tickers=shard_tickers, daily=daily)))
+            shard = [(ticker, self._compact_(data[ticker] if start is None else data[ticker][data[ticker].index >= start]))
+                     for ticker in shard_tickers if ticker in data]
+            del data
+            print(f"shard of {len(shard)} tickers ({pos} of {len(tickers)}), {loaded[0] / 2**20:.1f} MB loaded")
+            metrics.count('shards')
+
+            if memory_budget_mb and shard:
+                per_ticker = self.MEMORY_OVERHEAD * loaded[0] / len(shard_tickers)
+                fit = max(1, int(memory_budget_mb * 2**20 / per_ticker)) if per_ticker else size
+                size = min(fit, int(shard_size)) if shard_size else fit
+            yield shard
+            del shard
+
+        # every shard is done: record the refresh as a whole universe pass would
+        self._daily_store.set_meta('refreshed_on', utility.get_date_mmddyyyy())
+        self._daily_store.set_meta('span', self.HISTORY_SPAN)
+        if timeframe != 'daily':
+            self._timeframe_store_(timeframe).set_meta('source_refreshed_on',
+                                                       self._daily_store.get_meta('refreshed_on'))
+
     #===========================================
     def get_close_on_date(self, back_date):
-        dd = DataDownloader()
-        close_data = []
-        for ticker in self._tickers_:
-            print(ticker)
-            close_data.append((ticker, dd.get_daily_close_on_date(ticker, back_date)))
+        """
+        Returns:
+            list: (ticker, close) tuples for every ticker; close is the last close
+                  on or before back_date, or None if not found.
+        """
+        prices = self.get_prices_as_of(back_date, fields=('Close',))
+        return [(ticker, None if pd.isna(close) else float(close)) for ticker, close in prices['Close'].items()]
+
+    def get_prices_as_of(self, date, tickers=None, fields=('Close', 'High', 'Low')):
+        """
+        Point-in-time lookup of the last daily bar on or before `date`.
 
-        return close_data
+        Weekends and holidays fall back to the previous session. Everything is
+        served from the local daily history with one vectorized lookup across
+        the universe; only tickers whose local history does not reach back to
+        `date` are fetched from the network (one batched request for a short
+        window around the date).
+
+        Args:
+            date (str or datetime): The as-of date ('YYYY-MM-DD').
+            tickers (str or list, optional): Ticker(s) to look up. Defaults to all.
+            fields (tuple, optional): Bar fields to return.
+
+        Returns:
+            pd.DataFrame: Indexed by ticker with the bar 'Date' and the fields;
+                          NaT/NaN where nothing was found.
+        """
+        if tickers is None:
+            tickers = self._tickers_
+        elif isinstance(tickers, str):
+            tickers = [tickers]
+        tickers = list(tickers)
+
+        prices = self.get_daily_panel().asof(date, fields).reindex(tickers)
+        prices.index.name = 'Ticker'
+
+        missing = prices.index[prices['Date'].isna()].tolist()
+        if missing:
+            day = pd.Timestamp(date).tz_localize(None).normalize()
+            print(f"fetching as-of {day.date()} prices for {len(missing)} tickers not covered locally")
+            window = self._download_all_(missing, span=None, interval="1d",
+                                         start=(day - pd.Timedelta(days=OHLCPanel.ASOF_MAX_GAP)).strftime('%Y-%m-%d'),
+                                         end=(day + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+            fetched = OHLCPanel.from_frames([(t, to_utc_index(df)) for t, df in window]).asof(date, fields)
+            if len(fetched):
+                # the local and fetched dates may differ in resolution
+                fetched['Date'] = fetched['Date'].astype(prices['Date'].dtype)
+                prices.loc[fetched.index, fetched.columns] = fetched
+        return prices
 
     def get_yearly_high(self, back_year):
-        dd = DataDownloader()
-        high_data = []
-        for ticker in self._tickers_:
-            print(ticker)
-            high_data.append((ticker, dd.get_yearly_high(ticker, back_year)))
+        """
+        Returns:
+            dict: ticker -> highest (adjusted) price in back_year, or None if not found.
+        """
+        stats = self.get_yearly_stats(back_year)
+        return {ticker: stats[ticker][0] for ticker in self._tickers_ if ticker in stats}
+
+    def get_yearly_stats(self, year):
+        """
+        Returns the (high, low, close) of every ticker for a calendar year.
+
+        Values come from the local yearly index. Tickers that are not indexed
+        yet are filled from one batched download of the year's daily bars;
+        completed years are then persisted so they are never fetched again.
+        Tickers whose download failed are not persisted and are retried on
+        the next call.
 
-        return high_data
+        Returns:
+            dict: ticker -> (high, low, close); (None, None, None) when there is no data.
+        """
+        year = int(year)
+        stats = self._yearly_index.load(year)
+        missing = [ticker for ticker in self._tickers_ if ticker not in stats]
+        if not missing:
+            return stats
+
+        print(f"building {year} high/low/close index for {len(missing)} tickers")
+        new_stats = {ticker: (None, None, None) for ticker in missing}
+        for ticker, df in self._download_all_(missing, span=None, interval="1d",
+                                              start=f"{year}-01-01", end=f"{year + 1}-01-01"):
+            df = df.dropna(subset=['High', 'Low', 'Close'])
+            if not df.empty:
+                new_stats[ticker] = (float(df['High'].max()), float(df['Low'].min()), float(df['Close'].iloc[-1]))
+
+        if year < datetime.date.today().year:
+            failed = set(self._failed_downloads_)
+            if failed:
+                print(f"{len(failed)} tickers failed to download, not indexing them for {year}")
+            self._yearly_index.save(year, {ticker: values for ticker, values in new_stats.items()
+                                           if ticker not in failed})
+        stats.update(new_stats)
+        return stats
 
     def _prepare_daily_data_(self):
-        self._daily_data_ = self.load_daily_data_from_sqlite()
-        if not self._daily_data_:
-            ddata = []
-            dd = DataDownloader()
-            for ticker in self._tickers_:
-                df = dd.download_daily_data(ticker)
-                if len(df) > 0:
-                    ddata.append((ticker, df))
-            self._daily_data_ = ddata
-            self.serialize_daily_data_to_sqlite()
+        self._dailydata_ = self._load_and_refresh_(self._daily_store, span=self.HISTORY_SPAN, interval="1d")
+        print(len(self._dailydata_))
+
+    def _iter_daily_(self):
+        if self._dailydata_:
+            yield from self._dailydata_
+            return
+
+        data = {}
+        for ticker, df in self._iter_load_and_refresh_(self._daily_store, span=self.HISTORY_SPAN, interval="1d"):
+            data[ticker] = df
+            yield ticker, df
+        self._dailydata_ = [(ticker, data[ticker]) for ticker in self._tickers_ if ticker in data]
+
+    def _iter_timeframe_(self, timeframe):
+        if timeframe in self._resampled_:
+            yield from self._resampled_[timeframe]
+            return
+
+        data = {}
+        for ticker, df in self._iter_resampled_(timeframe):
+            df = data[ticker] = self._compact_(df)
+            yield ticker, df
+        self._resampled_[timeframe] = [(ticker, data[ticker]) for ticker in self._tickers_ if ticker in data]
 
     #===========================================
     
@@ -69,21 +386,234 @@ class DataManager:
     #===========================================
 
     def _prepare_weekly_data_(self, span='2y'):
-        self._weekly_data_ = self.load_weekly_data_from_sqlite()
-        if not self._weekly_data_:
-            print("populating weekly data")
-            wdata = []
-            dd = DataDownloader()
-            print(len(self._tickers_))
-            for ticker in self._tickers_:
-                df = dd.download_weekly_data(ticker, span=span)
-                if len(df) > 0:
-                    wdata.append((ticker, df))
-            
-            print(len(wdata))
-            self._weeklydata_ = wdata
+        today = utility.get_date_mmddyyyy()
+        if self._weekly_panel and self._weekly_panel.stamp() == today and self._weekly_panel.open():
+            print(f"Loading weekly data from panel cache {self._weekly_panel.cache_dir}")
+            self._weeklydata_ = self._weekly_panel.items(self._tickers_)
             print(len(self._weeklydata_))
-            self.serialize_weekly_data_to_sqlite()
+            return
+
+        self._weeklydata_ = self.get_timeframe_data('weekly', span)
+        print(len(self._weeklydata_))
+        if self._weekly_panel:
+            self._weekly_panel.write(self._weeklydata_, stamp=today)
+
+    #===========================================
+
+    def _prepare_resampled_(self, timeframe):
+        data = {ticker: self._compact_(df) for ticker, df in self._iter_resampled_(timeframe)}
+        return [(ticker, data[ticker]) for ticker in self._tickers_ if ticker in data]
+
+    def _iter_resampled_(self, timeframe, tickers=None, daily=None):
+        """
+        Resamples the daily bars to `timeframe`, reusing the bars cached in the
+        timeframe's store: each ticker only has its last (forming) period and
+        any newer periods rebuilt. Yields (ticker, df) as each ticker is ready.
+
+        With `tickers` only those are loaded and resampled (from the `daily`
+        (ticker, df) iterable when given) and the store is not marked as
+        up to date, see iter_shards.
+        """
+        shard = tickers is not None
+        tickers = self._tickers_ if tickers is None else tickers
+        store = self._timeframe_store_(timeframe)
+        try:
+            cached = dict(store.load(tickers) if shard else store.load())
+        except Exception as e:
+            print(f"Error during loading from SQLite: {e}")
+            cached = {}
+
+        # resampled from today's daily bars already: no need to load the daily store
+        source_stamp = self._daily_store.get_meta('refreshed_on')
+        if (cached and source_stamp == utility.get_date_mmddyyyy()
+                and store.get_meta('source_refreshed_on') == source_stamp
+                and all(ticker in cached for ticker in tickers)):
+            print(f"{timeframe} bars already up to date")
+            for ticker in tickers:
+                yield ticker, cached[ticker]
+            return
+
+        if daily is None:
+            daily = self._iter_daily_() if not shard else self._iter_load_and_refresh_(
+                self._daily_store, span=self.HISTORY_SPAN, interval="1d", tickers=tickers)
+
+        print(f"resampling daily bars to {timeframe}")
+        changed = []
+        finished = False
+        try:
+            for ticker, df in daily:
+                old = cached.get(ticker)
+                with metrics.span(f"resample.{timeframe}", ticker):
+                    bars = update_resampled(old, df, timeframe)
+                if old is None or not bars.equals(old):
+                    changed.append((ticker, bars))
+                yield ticker, bars
+            finished = True
+        finally:
+            # also keeps the work done so far when the consumer stops early
+            print(f"{len(changed)} tickers updated")
+            store.save(changed)
+            if finished and not shard:
+                store.set_meta('source_refreshed_on', self._daily_store.get_meta('refreshed_on'))
+
+    def _timeframe_store_(self, timeframe):
+        if timeframe not in self._timeframe_stores:
+            path = os.path.join(".", DataDownloader.DATA_DIR, self._db_name.format(timeframe=timeframe))
+            self._timeframe_stores[timeframe] = self._store_cls(path)
+        return self._timeframe_stores[timeframe]
+
+    def _compact_(self, df):
+        return compact_frame(df) if self._compact else df
+
+    @staticmethod
+    def _trim_span_(data, span):
+        start = span_start(span)
+        if start is None:
+            return data
+        return [(ticker, df[df.index >= start]) for ticker, df in data]
+
+    #===========================================
+
+    def _load_and_refresh_(self, store, span, interval):
+        """
+        Loads a store and, once a day, brings it up to date with _iter_refresh_.
+        Returns a list of (ticker, df) tuples in ticker order.
+        """
+        data = dict(self._iter_load_and_refresh_(store, span, interval))
+        return [(ticker, data[ticker]) for ticker in self._tickers_ if ticker in data]
+
+    def _iter_load_and_refresh_(self, store, span, interval, tickers=None):
+        """
+        Generator version of _load_and_refresh_: yields (ticker, df) as soon as
+        each ticker is available, i.e. straight from the store when no refresh is
+        due and otherwise as the refreshed tickers arrive from the network.
+        Changes are saved when the generator finishes, or is closed early (the
+        store is then not marked as refreshed). With `tickers` only those are
+        loaded and refreshed, and the store is not marked either.
+        """
+        shard = tickers is not None
+        tickers = self._tickers_ if tickers is None else tickers
+        today = utility.get_date_mmddyyyy()
+        try:
+            stored = dict(store.load(tickers) if shard else store.load())
+        except Exception as e:
+            print(f"Error during loading from SQLite: {e}")
+            stored = {}
+
+        if stored and store.get_meta('span') != span:
+            # history was downloaded for a different span; fetch it again
+            stored = {}
+
+        if stored and store.get_meta('refreshed_on') == today:
+            print(f"{interval} data already refreshed today")
+            for ticker in tickers:
+                if ticker in stored:
+                    yield ticker, stored[ticker]
+            return
+
+        print(f"refreshing {interval} data")
+        changed = []
+        finished = False
+        try:
+            for ticker, df in self._iter_refresh_(stored, store, span=span, interval=interval, tickers=tickers):
+                changed.append((ticker, df))
+                yield ticker, df
+            # tickers the refresh brought nothing new for keep their stored bars
+            updated = set(ticker for ticker, _ in changed)
+            for ticker in tickers:
+                if ticker in stored and ticker not in updated:
+                    yield ticker, stored[ticker]
+            finished = True
+        finally:
+            print(f"{len(changed)} tickers updated")
+            store.save(changed)
+            if finished and not shard:
+                store.set_meta('refreshed_on', today)
+                store.set_meta('span', span)
+
+    #===========================================
+
+    def _iter_refresh_(self, stored, store, span, interval, tickers=None):
+        """
+        Brings `stored` (ticker -> df) up to date in place and yields the changed
+        (ticker, df) tuples as their downloads arrive.
+
+        Tickers that are not stored yet get their full span downloaded. Stored
+        tickers only fetch the tail starting at their last stored bar, so the
+        still-forming bar is re-fetched and replaced. A split or dividend in the
+        tail means the adjusted history changed, so those tickers are fetched in full.
+        """
+        tickers = self._tickers_ if tickers is None else tickers
+        missing = [ticker for ticker in tickers if ticker not in stored]
+        last_bars = store.last_bars()
+
+        # group tickers by their last stored bar so each group is one batched request
+        by_start = {}
+        for ticker in tickers:
+            if ticker not in stored:
+                continue
+            last_bar = last_bars.get(ticker, stored[ticker].index[-1])
+            start = last_bar.tz_convert('America/New_York').strftime('%Y-%m-%d')
+            by_start.setdefault(start, []).append(ticker)
+
+        for start, group in by_start.items():
+            for ticker, tail in self._iter_download_(group, span=span, interval=interval, start=start):
+                tail = to_utc_index(tail)
+                if self._has_corporate_action(tail):
+                    missing.append(ticker)
+                    continue
+                old = stored[ticker]
+                stored[ticker] = pd.concat([old[old.index < tail.index[0]], tail[old.columns.intersection(tail.columns)]])
+                yield ticker, stored[ticker]
+
+        if missing:
+            print(f"downloading full history for {len(missing)} tickers")
+            for ticker, df in self._iter_download_(missing, span=span, interval=interval):
+                stored[ticker] = to_utc_index(df)
+                yield ticker, stored[ticker]
+
+    #===========================================
+
+    @staticmethod
+    def _has_corporate_action(df):
+        for col in ('Dividends', 'Stock Splits'):
+            if col in df.columns and (df[col].fillna(0) != 0).any():
+                return True
+        return False
+
+    #===========================================
+
+    def _download_all_(self, tickers, span, interval, start=None, end=None):
+        """
+        Downloads data for the given tickers from the provider, batched by default or one ticker per
+        request on a rate limited worker pool when bulk_download is disabled.
+        Returns a list of (ticker, df) tuples. The tickers that could not be
+        downloaded are left in self._failed_downloads_.
+        """
+        if self._bulk_download:
+            data = self._provider.download_many(tickers, span=span, interval=interval,
+                                                batch_size=self.DOWNLOAD_BATCH_SIZE, start=start, end=end)
+            self._failed_downloads_ = [ticker for ticker, _ in self._provider.failed]
+            return data
+
+        cd = ConcurrentDownloader(self._provider, max_workers=self.DOWNLOAD_WORKERS,
+                                  requests_per_second=self.REQUESTS_PER_SECOND)
+        data = cd.download(tickers, span=span, interval=interval, start=start, end=end)
+        self._failed_downloads_ = [ticker for ticker, _ in cd.failed]
+        return data
+
+    def _iter_download_(self, tickers, span, interval, start=None, end=None):
+        """
+        Like _download_all_, but yields (ticker, df) as the data arrives
+        (per batch, or per ticker on the worker pool).
+        """
+        if self._bulk_download:
+            return self._provider.iter_download_many(tickers, span=span, interval=interval,
+                                                     batch_size=self.DOWNLOAD_BATCH_SIZE, start=start, end=end)
+
+        cd = ConcurrentDownloader(self._provider, max_workers=self.DOWNLOAD_WORKERS,
+                                  requests_per_second=self.REQUESTS_PER_SECOND)
+        return cd.iter_download(tickers, span=span, interval=interval, start=start, end=end)
 
     #===========================================
 
@@ -91,7 +621,10 @@ class DataManager:
         """
         Checks for data files with dates in their names (mm_dd_yyyy format).
         If the date in the filename is not today's date, the file is deleted.
-        This ensures that data files are refreshed daily.
+        This ensures that data files are refreshed daily. The persistent
+        daily store and the resampled timeframe stores (e.g. daily_ohlc.db,
+        weekly_ohlc.db) have no date in their names and are refreshed
+        incrementally instead.
         """
         today_date_str = utility.get_date_mmddyyyy()
         data_dir = DataDownloader.DATA_DIR # Assuming DATA_DIR is accessible or defined
@@ -126,83 +659,35 @@ class DataManager:
 
     def serialize_weekly_data_to_sqlite(self):
         """
-        Serializes the cached weekly data for all tickers into an SQLite database.
-        Each ticker's data is stored in its own table named after the ticker symbol.
-
-        Args:
-            db_path (str): The path to the SQLite database file.
+        Serializes the cached weekly data for all tickers into the persistent weekly store
+        (one long (ticker, date) table, or one table per ticker with store='tables').
         """
         if not self._weeklydata_:
             print("No weekly data available to serialize.")
             return
 
-        # Ensure the data directory exists
-        data_dir = os.path.dirname(self.weekly_db_path)
-        if data_dir and not os.path.exists(data_dir):
-            os.makedirs(data_dir)
-
-        import sqlite3
-        conn = None
-        try: # Use self.weekly_db_path
-            conn = sqlite3.connect(self.weekly_db_path)
-            print(f"Serializing weekly data to {self.weekly_db_path}...")
-            for ticker, df in self._weeklydata_:
-                if not df.empty:
-                    # Save DataFrame to SQLite table, replacing if exists
-                    df.to_sql(ticker, conn, if_exists='replace', index=True)
-                    print(f"  Saved data for {ticker}")
-                else:
-                    print(f"  Skipping empty data for {ticker}")
-            print("Serialization complete.")
+        try:
+            self._weekly_store.save(self._weeklydata_)
         except Exception as e:
             print(f"Error during serialization to SQLite: {e}")
-        finally:
-            if conn:
-                conn.close()
 
     #===========================================
 
     def load_weekly_data_from_sqlite(self):
         """
-        Loads weekly data for all tickers from an SQLite database.
-        Each ticker's data is loaded from its own table named after the ticker symbol.
+        Loads weekly data for all tickers from the persistent weekly store.
 
-        Args:
-            db_path (str): The path to the SQLite database file.
-        
         Returns:
             list: A list of tuples, where each tuple contains (ticker, pd.DataFrame).
                   Returns an empty list if the database file does not exist or on error.
         """
-        if not os.path.exists(self.weekly_db_path):
-            print(f"Cached database not found at {self.weekly_db_path}. Cannot load weekly data.")
-            return []
-        
-        import sqlite3
-        conn = None
         try:
-            conn = sqlite3.connect(self.weekly_db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';") # Use self.weekly_db_path
-            tables = cursor.fetchall()
-            
-            loaded_data = []
-            print(f"Loading weekly data from {self.weekly_db_path}...")
-            for table_name_tuple in tables:
-                ticker = table_name_tuple[0]
-                df = pd.read_sql_query(f"SELECT * FROM '{ticker}'", conn, index_col='Date')
-                df.index = pd.to_datetime(df.index, utc=True) # Ensure Date is datetime index
-                loaded_data.append((ticker, df))
-                print(f"  Loaded data for {ticker}")
-            print("Loading complete.")
+            loaded_data = self._weekly_store.load()
             self._weeklydata_ = loaded_data
             return loaded_data
         except Exception as e:
             print(f"Error during loading from SQLite: {e}")
             return []
-        finally:
-            if conn:
-                conn.close()
 
     #===========================================
 
@@ -215,7 +700,7 @@ class DataManager:
             dd = DataDownloader()
             # This single call handles all the logic of checking for the file,
             # fetching if needed, and loading the tickers.
-            self._tickers_ = dd.get_ticker_list(filepath=self._ticker_filepath)
+            self._tickers_ = dd.get_ticker_list(filepath=self._ticker_filepath, provider=self._provider)
             print(len(self._tickers_))
             if self._tickers_ is None:
                 # Ensure self.tickers is a list even on failure.
@@ -0,0 +1,349 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from instrumentation import metrics
+
+#===========================================
+
+class OHLCStore:
+    """
+    Persistent (non-dated) SQLite store for per-ticker OHLC data.
+
+    Each ticker's data is kept in its own table named after the ticker symbol.
+    Two bookkeeping tables sit next to them: `_last_bar` records the last stored
+    bar of every ticker and `_store_meta` holds store wide values such as the
+    date of the last refresh.
+    """
+    META_TABLE = "_store_meta"
+    LAST_BAR_TABLE = "_last_bar"
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    #===========================================
+
+    def _connect(self):
+        data_dir = os.path.dirname(self.db_path)
+        if data_dir and not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.LAST_BAR_TABLE} (ticker TEXT PRIMARY KEY, last_bar TEXT)")
+        return conn
+
+    #===========================================
+
+    def exists(self):
+        return os.path.exists(self.db_path)
+
+    #===========================================
+
+    def get_meta(self, key, default=None):
+        if not self.exists():
+            return default
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT value FROM {self.META_TABLE} WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else default
+        finally:
+            conn.close()
+
+    def set_meta(self, key, value):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(f"INSERT OR REPLACE INTO {self.META_TABLE} (key, value) VALUES (?, ?)", (key, str(value)))
+        finally:
+            conn.close()
+
+    #===========================================
+
+    def last_bars(self):
+        """
+        Returns:
+            dict: ticker -> pd.Timestamp (UTC) of the last stored bar.
+        """
+        if not self.exists():
+            return {}
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT ticker, last_bar FROM {self.LAST_BAR_TABLE}").fetchall()
+            return {ticker: pd.Timestamp(last_bar) for ticker, last_bar in rows}
+        finally:
+            conn.close()
+
+    #===========================================
+
+    @metrics.timed()
+    def save(self, data):
+        """
+        Writes (replaces) the given tickers' data and records their last bar.
+        Tickers that are not passed in are left untouched.
+
+        Args:
+            data (list): A list of (ticker, pd.DataFrame) tuples.
+        """
+        conn = self._connect()
+        try:
+            print(f"Serializing data to {self.db_path}...")
+            for ticker, df in data:
+                if df.empty:
+                    print(f"  Skipping empty data for {ticker}")
+                    continue
+                df = to_utc_index(df)
+                df.index.name = 'Date'
+                df.to_sql(ticker, conn, if_exists='replace', index=True)
+                conn.execute(f"INSERT OR REPLACE INTO {self.LAST_BAR_TABLE} (ticker, last_bar) VALUES (?, ?)",
+                             (ticker, df.index[-1].isoformat()))
+            conn.commit()
+            print("Serialization complete.")
+        finally:
+            conn.close()
+
+    #===========================================
+
+    @metrics.timed()
+    def load(self, tickers=None):
+        """
+        Loads every ticker's data, or only the given tickers'.
+
+        Returns:
+            list: A list of (ticker, pd.DataFrame) tuples with a UTC DatetimeIndex.
+        """
+        if not self.exists():
+            print(f"Cached database not found at {self.db_path}.")
+            return []
+
+        conn = self._connect()
+        try:
+            tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()
+            loaded_data = []
+            print(f"Loading data from {self.db_path}...")
+            wanted = None if tickers is None else set(tickers)
+            for (ticker,) in tables:
+                if ticker.startswith('_') or (wanted is not None and ticker not in wanted):
+                    continue
+                df = pd.read_sql_query(f"SELECT * FROM '{ticker}'", conn, index_col='Date')
+                df.index = pd.to_datetime(df.index, utc=True)
+                loaded_data.append((ticker, df))
+            print(f"Loaded {len(loaded_data)} tickers.")
+            return loaded_data
+        finally:
+            conn.close()
+
+#===========================================
+
+def to_utc_index(df):
+    """Returns df with its DatetimeIndex converted (or localized) to UTC."""
+    if df.empty or not isinstance(df.index, pd.DatetimeIndex):
+        return df
+    if df.index.tz is None:
+        df.index = df.index.tz_localize('UTC')
+    elif str(df.index.tz) != 'UTC':
+        df.index = df.index.tz_convert('UTC')
+    return df
+
+#===========================================
+
+# the bar columns the strategies work with
+COMPACT_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def compact_frame(df):
+    """
+    Returns a compact copy of df: only COMPACT_COLUMNS, prices as float32 and
+    volume as int64 (dividends and splits dropped), about half the memory of
+    the stored float64 bars. Prices keep ~7 significant digits.
+    """
+    cols = [col for col in COMPACT_COLUMNS if col in df.columns]
+    df = df[cols]
+    if 'Volume' in cols:
+        df = df.assign(Volume=df['Volume'].fillna(0))
+    return df.astype({col: np.int64 if col == 'Volume' else np.float32 for col in cols})
+
+#===========================================
+
+class LongOHLCStore(OHLCStore):
+    """
+    Persistent SQLite store keeping every ticker's bars in one long-format table.
+
+    Rows are keyed by (ticker, date) with the date stored as integer epoch
+    seconds (UTC). The table is WITHOUT ROWID, so the primary key is the
+    clustered index and covers the per-ticker range scans. Writes are batched
+    with executemany in a single transaction and load() reads the whole table
+    with one query, splitting it per ticker with groupby.
+    """
+    OHLC_TABLE = "ohlc"
+    COLUMNS = [('Open', 'open'), ('High', 'high'), ('Low', 'low'), ('Close', 'close'),
+               ('Volume', 'volume'), ('Dividends', 'dividends'), ('Stock Splits', 'splits')]
+    MAX_PARAMS = 500  # tickers per "IN (...)" query
+
+    #===========================================
+
+    def _connect(self):
+        conn = super()._connect()
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.OHLC_TABLE} (
+                ticker TEXT NOT NULL,
+                date INTEGER NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume INTEGER,
+                dividends REAL,
+                splits REAL,
+                PRIMARY KEY (ticker, date)
+            ) WITHOUT ROWID
+        """)
+        return conn
+
+    #===========================================
+
+    def last_bars(self):
+        if not self.exists():
+            return {}
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT ticker, MAX(date) FROM {self.OHLC_TABLE} GROUP BY ticker").fetchall()
+            return {ticker: pd.Timestamp(last_bar, unit='s', tz='UTC') for ticker, last_bar in rows}
+        finally:
+            conn.close()
+
+    #===========================================
+
+    @metrics.timed()
+    def save(self, data):
+        conn = self._connect()
+        try:
+            print(f"Serializing data to {self.db_path}...")
+            with conn:
+                for ticker, df in data:
+                    if df.empty:
+                        print(f"  Skipping empty data for {ticker}")
+                        continue
+                    conn.execute(f"DELETE FROM {self.OHLC_TABLE} WHERE ticker = ?", (ticker,))
+                    conn.executemany(
+                        f"INSERT INTO {self.OHLC_TABLE} (ticker, date, {', '.join(c for _, c in self.COLUMNS)}) "
+                        f"VALUES (?, ?{', ?' * len(self.COLUMNS)})",
+                        self._rows(ticker, to_utc_index(df)))
+            print("Serialization complete.")
+        finally:
+            conn.close()
+
+    def _rows(self, ticker, df):
+        epochs = df.index.as_unit('s').asi8.tolist()
+        values = []
+        for col, _ in self.COLUMNS:
+            if col not in df.columns:
+                values.append([None] * len(df))
+            elif col == 'Volume':
+                values.append(df[col].fillna(0).astype('int64').tolist())
+            else:
+                values.append(df[col].astype('float64').tolist())
+        return zip([ticker] * len(df), epochs, *values)
+
+    #===========================================
+
+    @metrics.timed()
+    def load(self, tickers=None):
+        if not self.exists():
+            print(f"Cached database not found at {self.db_path}.")
+            return []
+
+        conn = self._connect()
+        try:
+            print(f"Loading data from {self.db_path}...")
+            if tickers is None:
+                all_df = pd.read_sql_query(f"SELECT * FROM {self.OHLC_TABLE} ORDER BY ticker, date", conn)
+            else:
+                # the primary key makes this a range scan per ticker; stay below SQLite's parameter limit
+                tickers = list(tickers)
+                parts = [pd.read_sql_query(f"SELECT * FROM {self.OHLC_TABLE} WHERE ticker IN "
+                                           f"({', '.join('?' * len(group))}) ORDER BY ticker, date",
+                                           conn, params=group)
+                         for group in (tickers[i:i + self.MAX_PARAMS] for i in range(0, len(tickers), self.MAX_PARAMS))]
+                # a group with none of its tickers stored comes back as an empty object frame,
+                # which would turn the concatenated columns into objects
+                parts = [part for part in parts if not part.empty]
+                all_df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+                    columns=['ticker', 'date'] + [c for _, c in self.COLUMNS])
+        finally:
+            conn.close()
+
+        all_df = all_df.rename(columns={c: col for col, c in self.COLUMNS})
+        all_df['Date'] = pd.to_datetime(all_df['date'], unit='s', utc=True)
+        all_df = all_df.drop(columns='date').set_index('Date')
+
+        loaded_data = [(ticker, df.drop(columns='ticker'))
+                       for ticker, df in all_df.groupby('ticker', sort=False)]
+        print(f"Loaded {len(loaded_data)} tickers.")
+        return loaded_data
+
+#===========================================
+
+class YearlyStatsIndex:
+    """
+    Persistent per-(ticker, year) high / low / close index.
+
+    Only completed years are stored since their values never change. A row
+    with NULL values records that the ticker had no data for that year, so
+    it is not downloaded again.
+    """
+    TABLE = "yearly_stats"
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def _connect(self):
+        data_dir = os.path.dirname(self.db_path)
+        if data_dir and not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                ticker TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                high REAL,
+                low REAL,
+                close REAL,
+                PRIMARY KEY (year, ticker)
+            ) WITHOUT ROWID
+        """)
+        return conn
+
+    #===========================================
+
+    @metrics.timed()
+    def load(self, year):
+        """
+        Returns:
+            dict: ticker -> (high, low, close) for the year; values are None
+                  for tickers known to have no data.
+        """
+        if not os.path.exists(self.db_path):
+            return {}
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT ticker, high, low, close FROM {self.TABLE} WHERE year = ?",
+                                (int(year),)).fetchall()
+            return {ticker: (high, low, close) for ticker, high, low, close in rows}
+        finally:
+            conn.close()
+
+    @metrics.timed()
+    def save(self, year, stats):
+        """
+        Args:
+            stats (dict): ticker -> (high, low, close), or (None, None, None).
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.TABLE} (ticker, year, high, low, close) VALUES (?, ?, ?, ?, ?)",
+                    [(ticker, int(year), *values) for ticker, values in stats.items()])
+        finally:
+            conn.close()
+
+#===========================================
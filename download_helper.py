@@ -2,18 +2,21 @@ import json
 import os
 import pandas as pd
 import requests
-import yfinance as yf
+from instrumentation import metrics
+from providers import MarketDataProvider
 
 #=============================================
 
-class DataDownloader:
+class DataDownloader(MarketDataProvider):
     """
     Manages fetching and storing S&P 500 ticker symbols from Wikipedia.
+    This is the default market data provider: bars come from yfinance.
     """
     WIKIPEDIA_URL = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
     DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
     DATA_DIR = "data"
     DEFAULT_FILENAME = "sp500_tickers.json"
+    HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
 
     def __init__(self, url=None, headers=None):
         """
@@ -28,7 +31,7 @@ class DataDownloader:
 
     #=============================================
 
-    def get_ticker_list(self, filepath=None):
+    def get_ticker_list(self, filepath=None, provider=None):
         """
         Ensures tickers are available, fetching and saving them if necessary.
 
@@ -40,6 +43,8 @@ class DataDownloader:
         Args:
             filepath (str, optional): The path to the JSON file. Defaults to
                                       the class default.
+            provider (MarketDataProvider, optional): Source of the tickers when
+                                      the file is missing. Defaults to Wikipedia.
 
         Returns:
             list: A list of S&P 500 ticker symbols, or an empty list on failure.
@@ -53,7 +58,7 @@ class DataDownloader:
                 return tickers
             print(f"File '{filepath}' found but was empty or corrupt. Refetching...")
 
-        tickers = self._fetch_tickers()
+        tickers = (provider or self).fetch_tickers()
         self._save_tickers_to_json(tickers, os.path.basename(filepath))
         return tickers
 
@@ -110,11 +115,7 @@ class DataDownloader:
         """
         print(f"\nDownloading {span} of {interval} data for {ticker}...")
         try:
-            stock = yf.Ticker(ticker)
-            # yfinance returns an empty dataframe for invalid tickers
-            # or if no data is found for the period.
-            hist_df = stock.history(period=span, interval=interval)
-            hist_df = self._flatten_yfinance_columns(hist_df)
+            hist_df = self.fetch_historic_data(ticker, span=span, interval=interval)
             if hist_df.empty:
                 print(f"Warning: No data found for ticker '{ticker}' for the given period.")
             return hist_df
@@ -123,7 +124,131 @@ class DataDownloader:
             return pd.DataFrame()  # Return empty DataFrame on error
 
     #=============================================
-    
+
+    def fetch_historic_data(self, ticker, span="1y", interval="1d", start=None, end=None):
+        """
+        Same as download_historic_data but lets network errors (e.g. rate limiting)
+        propagate, so callers such as ConcurrentDownloader can retry them.
+        When start ('YYYY-MM-DD', optionally with an exclusive end) is given it
+        is used instead of span.
+        """
+        import yfinance as yf
+        stock = yf.Ticker(ticker)
+        # yfinance returns an empty dataframe for invalid tickers
+        # or if no data is found for the period.
+        if start:
+            hist_df = stock.history(start=start, end=end, interval=interval)
+        else:
+            hist_df = stock.history(period=span, interval=interval)
+        return self._flatten_yfinance_columns(hist_df)
+
+    #=============================================
+
+    def download_many(self, tickers, span="1y", interval="1d", batch_size=100, start=None, end=None):
+        """
+        Downloads historical OHLC data for many tickers using batched yfinance requests.
+
+        Each batch of symbols is fetched with a single yf.download call and the
+        combined result is split back into one DataFrame per ticker.
+
+        Args:
+            tickers (list): The stock ticker symbols.
+            span (str, optional): The time span for the data. Defaults to "1y".
+            interval (str, optional): The data interval. Defaults to "1d".
+            batch_size (int, optional): Number of symbols fetched per request. Defaults to 100.
+            start (str, optional): 'YYYY-MM-DD' start date. When given it is used
+                                   instead of span to fetch only the recent tail.
+            end (str, optional): Exclusive 'YYYY-MM-DD' end date, used with start.
+
+        Returns:
+            list: A list of (ticker, pd.DataFrame) tuples in input order.
+                  Tickers without data are left out and recorded in
+                  self.failed, with the tickers of failed batches.
+        """
+        return list(self.iter_download_many(tickers, span=span, interval=interval,
+                                            batch_size=batch_size, start=start, end=end))
+
+    def iter_download_many(self, tickers, span="1y", interval="1d", batch_size=100, start=None, end=None):
+        """
+        Generator version of download_many: yields (ticker, df) as soon as the
+        batch containing the ticker has arrived. The next batch is only requested
+        once the consumer has taken the previous one.
+
+        yf.download does not raise for single tickers; it logs their errors and
+        returns empty columns for them. So every ticker a batch brings no bars
+        for is recorded in self.failed (with yfinance's error when it has one),
+        and callers that persist "no data" must not trust it for those.
+        """
+        import yfinance as yf
+        self.failed = []
+        tickers = list(tickers)
+        batch_size = max(1, int(batch_size))
+        for i in range(0, len(tickers), batch_size):
+            batch = tickers[i:i + batch_size]
+            print(f"\nDownloading {start or span} of {interval} data for {len(batch)} tickers "
+                  f"({i + 1}-{i + len(batch)} of {len(tickers)})...")
+            metrics.count('network.requests')
+            try:
+                period = {'start': start, 'end': end} if start else {'period': span}
+                with metrics.span('download.batch'):
+                    batch_df = yf.download(batch, **period, interval=interval, actions=True,
+                                           group_by='column', auto_adjust=True, ignore_tz=False,
+                                           progress=False, threads=True, multi_level_index=True)
+            except Exception as e:
+                print(f"An error occurred while downloading batch starting at {batch[0]}: {e}")
+                metrics.count('network.failures')
+                self.failed.extend((ticker, str(e)) for ticker in batch)
+                continue
+            if metrics.enabled and batch_df is not None:
+                metrics.observe('network.frame_bytes', int(batch_df.memory_usage().sum()))
+
+            errors = self._batch_errors_()
+            for ticker, df in self._split_batch_frame(batch_df, batch):
+                if df.empty:
+                    error = errors.get(ticker, "no data returned")
+                    print(f"Warning: No data found for ticker '{ticker}' for the given period ({error}).")
+                    self.failed.append((ticker, error))
+                    continue
+                yield ticker, df
+
+    #=============================================
+
+    @staticmethod
+    def _batch_errors_():
+        """Returns the per-ticker errors yfinance logged for the last yf.download call."""
+        try:
+            from yfinance import shared
+            return {ticker: str(error) for ticker, error in getattr(shared, '_ERRORS', {}).items()}
+        except ImportError:
+            return {}
+
+    def _split_batch_frame(self, batch_df, tickers):
+        """
+        Splits a multi-ticker yfinance frame with (Price, Ticker) columns into per-ticker frames.
+
+        Rows the ticker has no data for (the batch index is the union of all
+        tickers' dates) are dropped.
+        """
+        if batch_df is None or batch_df.empty or not isinstance(batch_df.columns, pd.MultiIndex):
+            return [(ticker, pd.DataFrame()) for ticker in tickers]
+
+        available = set(batch_df.columns.get_level_values(1))
+        frames = []
+        for ticker in tickers:
+            if ticker not in available:
+                frames.append((ticker, pd.DataFrame()))
+                continue
+            df = batch_df.loc[:, batch_df.columns.get_level_values(1) == ticker].copy()
+            df = self._flatten_yfinance_columns(df)
+            df = df.dropna(subset=[c for c in ('Open', 'High', 'Low', 'Close') if c in df.columns], how='all')
+            # keep the column order of Ticker.history() so cached frames look the same either way
+            ordered = [c for c in self.HISTORY_COLUMNS if c in df.columns]
+            df = df[ordered + [c for c in df.columns if c not in ordered]]
+            frames.append((ticker, df))
+        return frames
+
+    #=============================================
+
     def get_yearly_high(self, ticker, back_year):
         """
         Fetches the yearly high price for a given ticker and year.
@@ -134,6 +259,7 @@ class DataDownloader:
         Returns:
             float or None: The highest price in that year, or None if not found.
         """
+        import yfinance as yf
         year    = int(back_year)
         start   = f"{year}-01-01"
         end     = f"{year+1}-01-01"
@@ -161,6 +287,7 @@ class DataDownloader:
         Returns:
             float or None: The closing price, or None if not found.
         """
+        import yfinance as yf
         # Convert date to string in 'YYYY-MM-DD' format
         if hasattr(date, 'strftime'):
             date_obj = date
@@ -204,7 +331,7 @@ class DataDownloader:
     
     #=============================================
     
-    def _fetch_tickers(self):
+    def fetch_tickers(self):
         """
         Fetches the list of S&P 500 tickers from the configured URL.
 
@@ -0,0 +1,221 @@
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+from download_helper import DataDownloader
+from providers import MarketDataProvider, RateLimitError
+from instrumentation import metrics
+
+#=============================================
+
+class RateLimiter:
+    """
+    Thread-safe token bucket. Tokens refill at `rate` per second up to `capacity`;
+    every request takes one token and blocks until one is available.
+    """
+
+    def __init__(self, rate=5.0, capacity=None):
+        """
+        Args:
+            rate (float): Sustained requests per second.
+            capacity (int, optional): Burst size. Defaults to max(1, rate).
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+#=============================================
+
+class ConcurrentDownloader:
+    """
+    Fetches historical data for many tickers on a worker pool.
+
+    Every request goes through a shared RateLimiter and failed requests are
+    retried per ticker with exponential backoff (plus jitter). Results come
+    back in the same order as the input tickers.
+    """
+
+    def __init__(self, provider=None, max_workers=8, requests_per_second=5.0,
+                 max_retries=4, backoff_base=0.5, backoff_max=30.0):
+        """
+        Args:
+            provider (MarketDataProvider, optional): Anything with a raising
+                fetch_historic_data(ticker, span, interval, start, end) method.
+                Defaults to DataDownloader.
+            max_workers (int): Size of the thread pool.
+            requests_per_second (float): Token bucket refill rate.
+            max_retries (int): Retries per ticker after the first attempt.
+            backoff_base (float): Delay in seconds before the first retry; doubled every retry.
+            backoff_max (float): Upper bound for a single backoff delay.
+        """
+        self.provider = provider or DataDownloader()
+        self.max_workers = max(1, int(max_workers))
+        self.limiter = RateLimiter(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failed = []
+
+    #=============================================
+
+    def download(self, tickers, span="1y", interval="1d", start=None, end=None):
+        """
+        Downloads all tickers concurrently. start/end ('YYYY-MM-DD') override span when given.
+
+        Returns:
+            list: (ticker, pd.DataFrame) tuples in input order. Tickers without
+                  data, or that still fail after all retries, are left out and
+                  the failures are recorded in self.failed.
+        """
+        self.failed = []
+        tickers = list(tickers)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            frames = list(pool.map(lambda t: self._fetch_with_retry(t, span, interval, start, end), tickers))
+
+        return [(ticker, df) for ticker, df in zip(tickers, frames) if df is not None and not df.empty]
+
+    def iter_download(self, tickers, span="1y", interval="1d", start=None, end=None, max_pending=None):
+        """
+        Generator version of download: yields (ticker, df) in completion order as
+        soon as each ticker arrives.
+
+        At most max_pending requests (default: twice the pool size) are queued or
+        in flight; new ones are only submitted as the consumer takes results, so a
+        slow consumer also slows down the downloads.
+        """
+        self.failed = []
+        max_pending = max_pending or 2 * self.max_workers
+        remaining = iter(tickers)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {}
+
+            def submit_next():
+                for ticker in remaining:
+                    pending[pool.submit(self._fetch_with_retry, ticker, span, interval, start, end)] = ticker
+                    return True
+                return False
+
+            while len(pending) < max_pending and submit_next():
+                pass
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ticker = pending.pop(future)
+                    submit_next()
+                    df = future.result()
+                    if df is not None and not df.empty:
+                        yield ticker, df
+
+    #=============================================
+
+    def _fetch_with_retry(self, ticker, span, interval, start=None, end=None):
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            metrics.count('network.requests')
+            try:
+                with metrics.span('download', ticker):
+                    df = self.provider.fetch_historic_data(ticker, span=span, interval=interval,
+                                                           start=start, end=end)
+                if metrics.enabled and df is not None:
+                    metrics.observe('network.frame_bytes', int(df.memory_usage().sum()))
+                return df
+            except Exception as e:
+                metrics.count('network.errors')
+                if attempt == self.max_retries:
+                    print(f"Giving up on {ticker} after {attempt + 1} attempts: {e}")
+                    metrics.count('network.failures')
+                    self.failed.append((ticker, str(e)))
+                    return None
+                metrics.count('network.retries')
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                delay *= 0.5 + random.random() / 2
+                print(f"Retrying {ticker} in {delay:.2f}s (attempt {attempt + 1}): {e}")
+                time.sleep(delay)
+
+#=============================================
+
+class SimulatedProvider(MarketDataProvider):
+    """
+    Local stand-in for DataDownloader used to exercise ConcurrentDownloader
+    without the network. Each call sleeps for `latency` seconds and fails
+    with RateLimitError with probability `error_rate`.
+    """
+
+    def __init__(self, latency=0.05, error_rate=0.1, bars=104, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.bars = bars
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fetch_historic_data(self, ticker, span="1y", interval="1d", start=None, end=None):
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.error_rate
+        time.sleep(self.latency)
+        if fail:
+            raise RateLimitError(f"429 Too Many Requests for {ticker}")
+
+        df = synthetic_frame(ticker, self.bars, interval)
+        tz = df.index.tz
+        if start:
+            df = df[df.index >= pd.Timestamp(start, tz=tz)]
+        if end:
+            df = df[df.index < pd.Timestamp(end, tz=tz)]
+        return df
+
+#=============================================
+
+def synthetic_frame(ticker, bars, interval="1d", end=None, seed=None):
+    """
+    Generates a random walk OHLCV frame shaped like a yfinance history.
+
+    The bars are seeded per ticker (and `seed`), so the same arguments always
+    produce the same frame.
+
+    Args:
+        ticker (str): Ticker symbol, part of the seed.
+        bars (int): Number of bars.
+        interval (str, optional): "1wk" for weekly (Monday) bars, anything else for business days.
+        end (str or pd.Timestamp, optional): Last bar date. Defaults to today.
+        seed (int, optional): Extra seed to draw a different universe.
+
+    Returns:
+        pd.DataFrame: Open/High/Low/Close/Volume/Dividends/Stock Splits indexed by
+                      a New York DatetimeIndex.
+    """
+    freq = "W-MON" if interval == "1wk" else "B"
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today()
+    index = pd.date_range(end=end.normalize(), periods=bars, freq=freq, tz="America/New_York", name="Date")
+    key = zlib.crc32(ticker.encode())
+    rng = np.random.default_rng(key if seed is None else [seed, key])
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, bars))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, bars)))
+    return pd.DataFrame({
+        'Open': open_, 'High': high, 'Low': low, 'Close': close,
+        'Volume': rng.integers(1_000_000, 5_000_000, bars),
+        'Dividends': 0.0, 'Stock Splits': 0.0,
+    }, index=index)
+
+#=============================================
@@ -0,0 +1,220 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from instrumentation import metrics
+
+#===========================================
+# Array based indicator kernels shared by the strategies.
+# 1-D functions work on one ticker's bars, the *_2d variants on a
+# (tickers x bars) panel where shorter histories are NaN padded at the front.
+#===========================================
+
+def rolling_mean_deviation(values, window):
+    """
+    Rolling mean absolute deviation around the window mean, i.e. the same as
+    Series.rolling(window).apply(lambda x: (x - x.mean()).abs().mean()).
+
+    Args:
+        values (array-like): 1-D values, e.g. the typical price.
+        window (int): Window length.
+
+    Returns:
+        np.ndarray: float64 array of len(values); the first window-1 entries
+                    (and any window containing NaN) are NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return rolling_mean_deviation_2d(values[np.newaxis, :], window)[0]
+
+#===========================================
+
+def rolling_mean_deviation_2d(panel, window):
+    """
+    Batched rolling_mean_deviation over the last axis of a (tickers x bars) array.
+
+    The deviations are accumulated one window offset at a time, so memory
+    stays at a few (tickers x bars) arrays whatever the window.
+
+    Returns:
+        np.ndarray: float64 array with the same shape as panel.
+    """
+    panel = np.asarray(panel, dtype=np.float64)
+    out = np.full(panel.shape, np.nan)
+    if panel.shape[-1] < window:
+        return out
+    means = sliding_window_view(panel, window, axis=-1).mean(axis=-1)
+    count = means.shape[-1]
+    total = np.zeros_like(means)
+    deviation = np.empty_like(means)
+    for k in range(window):
+        np.subtract(panel[..., k:k + count], means, out=deviation)
+        total += np.abs(deviation, out=deviation)
+    out[..., window - 1:] = total / window
+    return out
+
+#===========================================
+
+def rolling_mean_2d(panel, window):
+    """Rolling simple mean over the last axis of a (tickers x bars) array."""
+    panel = np.asarray(panel, dtype=np.float64)
+    out = np.full(panel.shape, np.nan)
+    if panel.shape[-1] < window:
+        return out
+    out[..., window - 1:] = sliding_window_view(panel, window, axis=-1).mean(axis=-1)
+    return out
+
+#===========================================
+
+def rolling_std_2d(panel, window, ddof=1):
+    """Rolling standard deviation over the last axis of a (tickers x bars) array, like Series.rolling(window).std()."""
+    panel = np.asarray(panel, dtype=np.float64)
+    out = np.full(panel.shape, np.nan)
+    if panel.shape[-1] < window:
+        return out
+    out[..., window - 1:] = sliding_window_view(panel, window, axis=-1).std(axis=-1, ddof=ddof)
+    return out
+
+#===========================================
+
+def ema_2d(panel, span):
+    """
+    EMA along the last axis of a (tickers x bars) array, with the same
+    semantics as Series.ewm(span=span, adjust=False).mean() per row.
+    """
+    panel = np.asarray(panel, dtype=np.float64)
+    return pd.DataFrame(panel.T).ewm(span=span, adjust=False).mean().to_numpy().T
+
+#===========================================
+
+def ema_warmup(span, tolerance=1e-8):
+    """
+    Number of bars after which the seed of an ewm(span, adjust=False) EMA
+    weighs less than `tolerance`, i.e. the EMA over that many trailing bars
+    matches the EMA over the whole history to within `tolerance` (relative).
+    """
+    alpha = 2.0 / (span + 1)
+    return int(np.ceil(np.log(tolerance) / np.log(1 - alpha)))
+
+#===========================================
+
+def cci(high, low, close, window):
+    """
+    Commodity Channel Index: (TP - SMA(TP)) / (0.015 * MeanDeviation(TP)).
+
+    Args:
+        high, low, close (array-like): 1-D price arrays of equal length.
+        window (int): CCI window.
+
+    Returns:
+        np.ndarray: float64 CCI values, NaN during warm-up.
+    """
+    return cci_2d(np.asarray(high, dtype=np.float64)[np.newaxis, :],
+                  np.asarray(low, dtype=np.float64)[np.newaxis, :],
+                  np.asarray(close, dtype=np.float64)[np.newaxis, :], window)[0]
+
+#===========================================
+
+def cci_2d(high, low, close, window):
+    """Batched cci over a (tickers x bars) panel."""
+    typical = (np.asarray(high, dtype=np.float64) + np.asarray(low, dtype=np.float64)
+               + np.asarray(close, dtype=np.float64)) / 3
+    sma = rolling_mean_2d(typical, window)
+    mean_dev = rolling_mean_deviation_2d(typical, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (typical - sma) / (0.015 * mean_dev)
+
+#===========================================
+
+class IndicatorCache:
+    """
+    Memoizes indicator Series shared by the strategies.
+
+    Results are keyed by (ticker, indicator, params, last-bar timestamp, bar count),
+    so the same indicator on the same data is computed once per session no matter
+    which strategy asks for it; new bars produce a new key. The least recently
+    used entries are evicted once max_entries is reached.
+
+    Passing ticker=None bypasses the cache.
+    """
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    #===========================================
+
+    def typical_price(self, ticker, df):
+        return self._memo(ticker, df, 'typical_price', (),
+                          lambda: (df['High'] + df['Low'] + df['Close']) / 3)
+
+    def ema(self, ticker, df, span, column='Close'):
+        return self._memo(ticker, df, 'ema', (column, span),
+                          lambda: self._source(ticker, df, column).ewm(span=span, adjust=False).mean())
+
+    def sma(self, ticker, df, window, column='Close'):
+        return self._memo(ticker, df, 'sma', (column, window),
+                          lambda: self._source(ticker, df, column).rolling(window=window).mean())
+
+    def rolling_std(self, ticker, df, window, column='Close'):
+        return self._memo(ticker, df, 'rolling_std', (column, window),
+                          lambda: self._source(ticker, df, column).rolling(window=window).std())
+
+    def mean_deviation(self, ticker, df, window):
+        def compute():
+            tp = self.typical_price(ticker, df)
+            return pd.Series(rolling_mean_deviation(tp.to_numpy(), window), index=tp.index)
+        return self._memo(ticker, df, 'mean_deviation', (window,), compute)
+
+    def cci(self, ticker, df, window):
+        def compute():
+            tp = self.typical_price(ticker, df)
+            sma = self.sma(ticker, df, window, column='Typical Price')
+            return (tp - sma) / (0.015 * self.mean_deviation(ticker, df, window))
+        return self._memo(ticker, df, 'cci', (window,), compute)
+
+    #===========================================
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    #===========================================
+
+    def _source(self, ticker, df, column):
+        if column == 'Typical Price':
+            return self.typical_price(ticker, df)
+        return df[column]
+
+    def _memo(self, ticker, df, name, params, compute):
+        if ticker is None or df.empty:
+            return compute()
+
+        key = (ticker, name, params, df.index[-1], len(df))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.count('indicator_cache.hits')
+                return self._entries[key]
+            self.misses += 1
+        metrics.count('indicator_cache.misses')
+
+        with metrics.span(f"indicator.{name}"):
+            result = compute()
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+#===========================================
+# Session wide cache used by the strategies.
+indicator_cache = IndicatorCache()
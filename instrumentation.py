@@ -0,0 +1,235 @@
+import csv
+import datetime
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+#===========================================
+# Run-time instrumentation of the hot paths.
+# Code records spans (timed stages, optionally per ticker), counters and
+# value histograms on the module wide `metrics` instance; export() writes
+# them as JSON and CSV at the end of a run. While disabled (the default)
+# every call returns immediately.
+#===========================================
+
+class Histogram:
+    """
+    Log2 bucketed histogram of positive values, e.g. latencies in seconds.
+    Bucket i counts values in [2^(i-1), 2^i) * unit; bucket 0 everything below unit.
+    """
+    BUCKETS = 48
+
+    def __init__(self, unit=1e-6):
+        self.unit = unit
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * self.BUCKETS
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        i = 0 if value < self.unit else min(self.BUCKETS - 1, int(math.log2(value / self.unit)) + 1)
+        self.buckets[i] += 1
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (0-100)."""
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * q / 100.0)
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(self.max, self.unit * (2 ** i))
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+#===========================================
+
+class _NoSpan:
+    """Shared do-nothing context manager returned while metrics are disabled."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+#===========================================
+
+class Metrics:
+    """
+    Collects spans, counters and histograms for one process.
+
+        with metrics.span('download', ticker='AAPL'):
+            ...
+        metrics.count('network.requests')
+        metrics.observe('network.bytes', nbytes)
+
+    Span durations go into a latency histogram per span name; spans with a
+    ticker are also totalled per (name, ticker). Thread-safe.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    #===========================================
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._spans = {}
+            self._values = {}
+            self._tickers = {}
+            self._started = time.time()
+
+    #===========================================
+
+    def span(self, name, ticker=None):
+        """Context manager timing a stage; a no-op while disabled."""
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(name, ticker)
+
+    @contextmanager
+    def _span(self, name, ticker):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, ticker)
+
+    def record(self, name, seconds, ticker=None):
+        """Records a span that was timed by the caller."""
+        self._add(self._spans, name, seconds, ticker, unit=1e-6)
+
+    def _add(self, histograms, name, value, ticker, unit):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = histograms.get(name)
+            if hist is None:
+                hist = histograms[name] = Histogram(unit)
+            hist.add(value)
+            if ticker is not None:
+                stats = self._tickers.setdefault((name, ticker), [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = max(stats[2], value)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """Adds a value of at least 1 (e.g. a payload size in bytes) to the histogram `name`."""
+        self._add(self._values, name, value, None, unit=1.0)
+
+    def timed(self, name=None):
+        """Decorator recording every call of the function as a span."""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._span(span_name, None):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    #===========================================
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: counters, span (seconds) and value histogram summaries and per-ticker span totals.
+        """
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'started': datetime.datetime.fromtimestamp(self._started).isoformat(timespec='seconds'),
+                'elapsed_s': time.time() - self._started,
+                'counters': dict(self._counters),
+                'spans': {name: hist.summary() for name, hist in sorted(self._spans.items())},
+                'values': {name: hist.summary() for name, hist in sorted(self._values.items())},
+                'tickers': [{'span': name, 'ticker': ticker, 'count': n, 'total': total, 'max': longest}
+                            for (name, ticker), (n, total, longest) in sorted(self._tickers.items())],
+            }
+
+    def export(self, out_dir=os.path.join("reports", "metrics"), label="run"):
+        """
+        Writes the snapshot as <label>_<time>_<pid>.json plus a .csv with one
+        row per counter, span, value histogram and per-ticker span. Does nothing while disabled.
+
+        Returns:
+            str: The JSON path, or None.
+        """
+        if not self.enabled:
+            return None
+        snap = self.snapshot()
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, f"{label}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{snap['pid']}")
+        with open(base + ".json", 'w', encoding='utf-8') as f:
+            json.dump(snap, f, indent=2)
+
+        fields = ['kind', 'name', 'ticker', 'count', 'total', 'mean', 'min', 'max', 'p50', 'p95', 'p99']
+        with open(base + ".csv", 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for name, value in sorted(snap['counters'].items()):
+                writer.writerow({'kind': 'counter', 'name': name, 'total': value})
+            for kind in ('spans', 'values'):
+                for name, summary in snap[kind].items():
+                    writer.writerow({'kind': kind[:-1], 'name': name, **summary})
+            for row in snap['tickers']:
+                writer.writerow({'kind': 'ticker', 'name': row['span'], 'ticker': row['ticker'],
+                                 'count': row['count'], 'total': row['total'], 'max': row['max']})
+        print(f"Wrote metrics to {base}.json / .csv")
+        return base + ".json"
+
+    def print_summary(self, top=15):
+        """Prints the slowest spans by total time, the value histograms and the counters."""
+        if not self.enabled:
+            return
+        snap = self.snapshot()
+        print("\n--- Metrics ---")
+        spans = sorted(snap['spans'].items(), key=lambda item: -item[1]['total'])
+        for name, s in spans[:top]:
+            print(f"  {name:<36} {s['count']:7d} x  total {s['total']:9.3f}s  p50 {s['p50']:.6f}  p95 {s['p95']:.6f}")
+        for name, s in snap['values'].items():
+            print(f"  {name:<36} {s['count']:7d} x  total {s['total']:.0f}  mean {s['mean']:.0f}  max {s['max']:.0f}")
+        for name, value in sorted(snap['counters'].items()):
+            print(f"  {name:<36} {value}")
+
+#===========================================
+# Process wide instance used by the instrumented code.
+metrics = Metrics()
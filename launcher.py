@@ -1,9 +1,9 @@
 
 # Assuming downloader.py is in the same directory or in the python path
 #from thestrat import StratProcessor
-from data_manager import DataManager
 from st_strategy_factory import StrategyFactory
 from setup_helper import SetupLogger
+import multiprocessing
 
 #===========================================
 
@@ -37,9 +37,14 @@ class Context:
         Args:
             ticker_filepath (str): The path to the JSON file containing tickers.
         """
-        #self.dm = DataManager()
+        # Only initialize once per singleton instance
+        if hasattr(self, 'strat_factory'):
+            return
         self.strat_factory = StrategyFactory()
-        SetupLogger.clear_sameday_setup_log()
+        # spawned run-all workers re-import this module; they must not wipe
+        # the log the other workers are writing to.
+        if multiprocessing.parent_process() is None:
+            SetupLogger.clear_sameday_setup_log()
 
 
     #===========================================
@@ -47,10 +52,12 @@ class Context:
 
 #===========================================
 # globals.
-# Instantiate the Context class as a session object.
-# Other modules in the project can now `from launcher import session`
+# The session is created on first use rather than at import, so importing
+# this module (or running --help) does not touch the setup log.
+# Other modules in the project can use `from launcher import get_session`
 # to get access to the application context.
-session = Context()
+def get_session():
+    return Context()
 
 #===========================================    
 
@@ -58,25 +65,81 @@ session = Context()
 #===========================================
 
 if __name__ == "__main__":
+    import argparse
     import time
     start_time = time.perf_counter()
 
+    parser = argparse.ArgumentParser(description="SYJ_TA launcher")
+    parser.add_argument('strategy', nargs='?', default='parabolic',
+                        help=f"strategy to run: {', '.join(StrategyFactory.list_descriptions())}")
+    parser.add_argument('--all', action='store_true',
+                        help="run all strategies concurrently in a process pool")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="process pool size for --all (default: one per strategy)")
+    parser.add_argument('--scan', action='store_true',
+                        help="evaluate signals over each strategy's lookback window only")
+    parser.add_argument('--panel', action='store_true',
+                        help="find the tickers that fire with one vectorized scan of the universe")
+    parser.add_argument('--metrics', action='store_true',
+                        help="collect timings and counters and write them to reports/metrics")
+    parser.add_argument('--record', metavar='DIR', default=None,
+                        help="record the market data responses into DIR")
+    parser.add_argument('--replay', metavar='DIR', default=None,
+                        help="serve market data from a recording in DIR instead of the network")
+    parser.add_argument('--replay-latency', type=float, default=0.0,
+                        help="seconds added to every replayed request")
+    parser.add_argument('--replay-errors', type=float, default=0.0,
+                        help="probability of a replayed request failing with HTTP 429")
+    parser.add_argument('--shard-size', type=int, default=None,
+                        help="process the universe in shards of this many tickers")
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help="process the universe in shards sized to this working memory")
+    parser.add_argument('--history', default=None, metavar='SPAN',
+                        help="daily history kept locally, e.g. 5y or max (default 2y)")
+    parser.add_argument('--compact', action='store_true',
+                        help="keep resampled bars as float32 OHLC and int volume only")
+    args = parser.parse_args()
+    if args.all and (args.shard_size or args.memory_budget):
+        parser.error("--shard-size/--memory-budget apply to a single strategy, not --all")
+
+    if args.history:
+        from data_manager import DataManager
+        DataManager.HISTORY_SPAN = args.history
+    if args.compact:
+        from data_manager import DataManager
+        DataManager.COMPACT = True
+    if args.record or args.replay:
+        from data_manager import DataManager
+        from providers import RecordingProvider, ReplayProvider
+        if args.replay:
+            DataManager.PROVIDER = ReplayProvider(args.replay, latency=args.replay_latency,
+                                                  error_rate=args.replay_errors)
+        else:
+            DataManager.PROVIDER = RecordingProvider(args.record)
+    session = get_session()
+
+    from instrumentation import metrics
+    metrics.enable(args.metrics)
+
     try:
         print("--- SYJ_TA Launcher ---")
-        strat = session.strat_factory.get_instance_by_description('parabolic')
-        strat.process_data()
-        
-        """
-        strats_list = session.strat_factory.get_all_instances()
-
-        for strat in strats_list:
-            print(strat)
+        if args.all:
+            from parallel_runner import run_all
+            run_all(session.strat_factory.list_descriptions(), max_workers=args.workers, scan_mode=args.scan,
+                    panel_mode=args.panel)
+        else:
+            strat = session.strat_factory.get_instance_by_description(args.strategy)
+            strat.scan_mode = args.scan
+            type(strat).panel_mode = args.panel
+            strat.shard_size = args.shard_size
+            strat.memory_budget_mb = args.memory_budget
             strat.process_data()
-            #break # remove this in final edition
-        """
 
     except Exception as ex:
         print(ex)
+
+    metrics.print_summary()
+    metrics.export(label="launcher" if args.all else args.strategy)
     
     end_time = time.perf_counter()
     duration = end_time - start_time
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+#===========================================
+
+class OHLCPanel:
+    """
+    The whole universe as aligned 2-D arrays (tickers x bars).
+
+    Rows follow `tickers`, columns follow `dates` (the union of every ticker's
+    bar dates). Bars a ticker does not have, e.g. before it listed, are NaN.
+    Strategies use this to evaluate a signal for every ticker in one pass.
+    """
+    EXCHANGE_TZ = 'America/New_York'
+    ASOF_MAX_GAP = 10  # bars an as-of lookup may step back for a ticker without a bar
+
+    def __init__(self, tickers, dates, open_, high, low, close, volume):
+        self.tickers = tickers
+        self.dates = dates
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    #===========================================
+
+    @classmethod
+    def from_frames(cls, data):
+        """
+        Builds the panel from a list of (ticker, pd.DataFrame) tuples.
+        """
+        data = [(ticker, df) for ticker, df in data if not df.empty]
+        tickers = [ticker for ticker, _ in data]
+        if not data:
+            empty = np.empty((0, 0))
+            return cls(tickers, pd.DatetimeIndex([]), empty, empty, empty, empty, empty)
+
+        dates = data[0][1].index
+        for _, df in data[1:]:
+            if not df.index.equals(dates):
+                dates = dates.union(df.index)
+
+        shape = (len(data), len(dates))
+        fields = {col: np.full(shape, np.nan) for col in ('Open', 'High', 'Low', 'Close', 'Volume')}
+        for i, (_, df) in enumerate(data):
+            pos = dates.get_indexer(df.index)
+            for col, arr in fields.items():
+                if col in df.columns:
+                    arr[i, pos] = df[col].to_numpy(dtype=np.float64)
+
+        return cls(tickers, dates, fields['Open'], fields['High'], fields['Low'],
+                   fields['Close'], fields['Volume'])
+
+    #===========================================
+
+    def asof(self, date, fields=('Close', 'High', 'Low')):
+        """
+        Returns every ticker's last bar on or before the calendar day `date`
+        (exchange time), as one vectorized lookup.
+
+        The day is located with searchsorted, so weekends and holidays fall
+        back to the previous session. A ticker without a bar there (e.g. halted)
+        falls back up to ASOF_MAX_GAP bars.
+
+        Returns:
+            pd.DataFrame: Indexed by ticker with the bar 'Date' and the fields.
+        """
+        ts = pd.Timestamp(date)
+        if ts.tzinfo is None:
+            ts = ts.tz_localize(self.EXCHANGE_TZ)
+        cutoff = ts.tz_convert(self.EXCHANGE_TZ).normalize() + pd.Timedelta(days=1)
+        if self.dates.tz is None:
+            cutoff = cutoff.tz_localize(None)
+
+        end = int(self.dates.searchsorted(cutoff, side='left'))
+        start = max(0, end - self.ASOF_MAX_GAP)
+        valid = ~np.isnan(self.close[:, start:end])
+        found = valid.any(axis=1) if end > start else np.zeros(len(self), dtype=bool)
+        idx = end - 1 - np.argmax(valid[:, ::-1], axis=1) if end > start else np.zeros(len(self), dtype=int)
+
+        rows = np.arange(len(self))
+        # take/where keep the dates' time zone, also when nothing is found
+        result = {'Date': self.dates.take(idx).where(found) if len(self) else []}
+        for field in fields:
+            values = getattr(self, field.lower())
+            result[field] = np.where(found, values[rows, idx], np.nan) if len(self) else []
+        return pd.DataFrame(result, index=pd.Index(self.tickers, name='Ticker'))
+
+    #===========================================
+
+    def _bars_since_last_(self):
+        """Per row, the number of columns after the ticker's last valid close (0 for empty rows)."""
+        valid = ~np.isnan(self.close)
+        return np.where(valid.any(axis=1), np.argmax(valid[:, ::-1], axis=1), 0)
+
+    def stale_tickers(self):
+        """Returns the tickers whose last bar is older than the panel's last date."""
+        if not len(self) or not len(self.dates):
+            return []
+        return self.select(self._bars_since_last_() > 0)
+
+    def align_last(self):
+        """
+        Returns a panel whose rows end on each ticker's own last bar.
+
+        Rows of tickers whose last bar is older than the last date (halted,
+        delisted or not refreshed yet) are shifted right so that their last bar
+        is in the last column, which is what evaluating the ticker's own frame
+        looks at; the columns they vacate on the left are NaN. `dates` then only
+        describes the rows that were not shifted. Returns self when nothing moves.
+        """
+        if not len(self) or not len(self.dates):
+            return self
+        shift = self._bars_since_last_()
+        if not shift.any():
+            return self
+        src = np.arange(len(self.dates)) - shift[:, np.newaxis]
+        inside = src >= 0
+        src = np.maximum(src, 0)
+        rows = np.arange(len(self))[:, np.newaxis]
+        fields = [np.where(inside, values[rows, src], np.nan)
+                  for values in (self.open, self.high, self.low, self.close, self.volume)]
+        return OHLCPanel(self.tickers, self.dates, *fields)
+
+    #===========================================
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def select(self, mask):
+        """Returns the tickers for which the boolean row mask is True."""
+        return [ticker for ticker, hit in zip(self.tickers, mask) if hit]
+
+#===========================================
@@ -0,0 +1,140 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from instrumentation import metrics
+
+#===========================================
+
+class PanelCache:
+    """
+    Columnar on-disk cache of a whole universe of OHLCV bars.
+
+    All tickers are stored back to back in three flat files that are opened
+    with np.memmap:
+        dates.bin   - int64 epoch nanoseconds (UTC), one per bar
+        offsets.bin - int64 start row of every ticker, plus the total row count
+        values.bin  - float64 matrix (bars x COLUMNS), row major
+    meta.json holds the ticker order, row count and the day the cache was written.
+
+    frame(ticker) returns a DataFrame backed by a read-only view into the
+    memmap, so opening the cache does not read or deserialize any bars.
+    Strategies may add columns to these frames, but must not modify the OHLCV
+    values in place (copy first).
+    """
+    COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+    META_FILE = "meta.json"
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._meta = None
+        self._dates = None
+        self._offsets = None
+        self._values = None
+        self._positions = {}
+
+    #===========================================
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def exists(self):
+        return os.path.exists(self._path(self.META_FILE))
+
+    def stamp(self):
+        """Returns the mm_dd_yyyy day the cache was written, or None."""
+        if not self.exists():
+            return None
+        with open(self._path(self.META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f).get('stamp')
+
+    #===========================================
+
+    @metrics.timed()
+    def write(self, data, stamp):
+        """
+        Writes the universe to disk, replacing any previous cache.
+
+        Args:
+            data (list): A list of (ticker, pd.DataFrame) tuples.
+            stamp (str): Day the data is valid for (mm_dd_yyyy).
+        """
+        self.close()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data = [(ticker, df) for ticker, df in data if not df.empty]
+        lengths = np.array([len(df) for _, df in data], dtype=np.int64)
+        offsets = np.zeros(len(data) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        total = int(offsets[-1])
+
+        dates = np.empty(total, dtype=np.int64)
+        values = np.full((total, len(self.COLUMNS)), np.nan, dtype=np.float64)
+        for i, (ticker, df) in enumerate(data):
+            s, e = offsets[i], offsets[i + 1]
+            index = df.index.tz_convert('UTC') if df.index.tz is not None else df.index.tz_localize('UTC')
+            dates[s:e] = index.as_unit('ns').asi8
+            for j, col in enumerate(self.COLUMNS):
+                if col in df.columns:
+                    values[s:e, j] = df[col].to_numpy(dtype=np.float64)
+
+        # meta.json is written last, so a half written cache is never picked up
+        if os.path.exists(self._path(self.META_FILE)):
+            os.remove(self._path(self.META_FILE))
+        dates.tofile(self._path("dates.bin"))
+        offsets.tofile(self._path("offsets.bin"))
+        values.tofile(self._path("values.bin"))
+        meta = {'tickers': [ticker for ticker, _ in data], 'rows': total,
+                'columns': self.COLUMNS, 'stamp': stamp}
+        with open(self._path(self.META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        print(f"Wrote panel cache for {len(data)} tickers ({total} bars) to {self.cache_dir}")
+
+    #===========================================
+
+    @metrics.timed()
+    def open(self):
+        """Memory-maps the cache files. Returns False if there is no cache."""
+        if not self.exists():
+            return False
+        with open(self._path(self.META_FILE), 'r', encoding='utf-8') as f:
+            self._meta = json.load(f)
+        rows, ncols = self._meta['rows'], len(self._meta['columns'])
+        if rows == 0:
+            self._dates = np.empty(0, dtype=np.int64)
+            self._values = np.empty((0, ncols), dtype=np.float64)
+        else:
+            self._dates = np.memmap(self._path("dates.bin"), dtype=np.int64, mode='r', shape=(rows,))
+            self._values = np.memmap(self._path("values.bin"), dtype=np.float64, mode='r', shape=(rows, ncols))
+        self._offsets = np.memmap(self._path("offsets.bin"), dtype=np.int64, mode='r',
+                                  shape=(len(self._meta['tickers']) + 1,))
+        self._positions = {ticker: i for i, ticker in enumerate(self._meta['tickers'])}
+        return True
+
+    def close(self):
+        # drop the memmaps so the files can be replaced (required on Windows)
+        self._meta = self._dates = self._offsets = self._values = None
+        self._positions = {}
+
+    #===========================================
+
+    @property
+    def tickers(self):
+        return list(self._meta['tickers']) if self._meta else []
+
+    def frame(self, ticker):
+        """Returns a zero-copy DataFrame view of one ticker's bars."""
+        i = self._positions[ticker]
+        s, e = int(self._offsets[i]), int(self._offsets[i + 1])
+        index = pd.DatetimeIndex(self._dates[s:e].view('datetime64[ns]'), name='Date').tz_localize('UTC')
+        return pd.DataFrame(self._values[s:e], index=index, columns=self._meta['columns'], copy=False)
+
+    def items(self, tickers=None):
+        """
+        Returns:
+            list: (ticker, pd.DataFrame) tuples for `tickers` (default: all cached tickers).
+        """
+        if tickers is None:
+            tickers = self._meta['tickers']
+        return [(ticker, self.frame(ticker)) for ticker in tickers if ticker in self._positions]
+
+#===========================================
@@ -0,0 +1,98 @@
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_manager import DataManager
+from instrumentation import metrics
+
+#===========================================
+# Runs several strategies at once, one worker process per strategy.
+# The parent loads the weekly data once and writes it to the memory-mapped
+# panel cache; every worker maps the same files (shared through the OS page
+# cache) instead of loading or downloading the data again.
+#===========================================
+
+def _init_worker():
+    # workers only render into PdfPages, never to a window
+    import matplotlib
+    matplotlib.use('Agg')
+
+#===========================================
+
+def _run_strategy(description, panel_dir, scan_mode=False, collect_metrics=False, panel_mode=False):
+    """
+    Worker entry point. Never raises; returns (description, ok, seconds, error).
+    With collect_metrics the worker exports its own metrics, labelled with the description.
+    """
+    start = time.perf_counter()
+    if collect_metrics:
+        # a pool worker may run several strategies; keep each one's metrics apart
+        metrics.reset()
+        metrics.enable()
+    try:
+        from st_strategy_factory import StrategyFactory
+        strat = StrategyFactory.get_instance_by_description(description)
+        strat.scan_mode = scan_mode
+        type(strat).panel_mode = panel_mode
+        strat.dm.attach_weekly_panel(panel_dir)
+        strat.process_data()
+        return description, True, time.perf_counter() - start, None
+    except Exception:
+        return description, False, time.perf_counter() - start, traceback.format_exc()
+    finally:
+        # pool workers exit without running atexit handlers, so flush buffered setups here
+        from setup_helper import SetupLogger
+        SetupLogger.close()
+        metrics.export(label=description)
+
+#===========================================
+
+def run_all(descriptions, max_workers=None, scan_mode=False, panel_mode=False):
+    """
+    Runs the given strategies concurrently in a process pool.
+
+    A strategy that fails (or whose worker dies) is reported and does not
+    stop the others.
+
+    Args:
+        descriptions (list): Strategy descriptions as listed by StrategyFactory.
+        max_workers (int, optional): Pool size. Defaults to one worker per strategy.
+        scan_mode (bool, optional): Evaluate signals over each strategy's lookback only.
+        panel_mode (bool, optional): Select the tickers that fire with one vectorized
+                                     scan of the universe (BaseStrategy.panel_mode).
+
+    Workers collect and export metrics when they are enabled in the parent.
+
+    Returns:
+        list: (description, ok, seconds, error) tuples in input order.
+    """
+    descriptions = list(descriptions)
+    if not descriptions:
+        return []
+
+    load_start = time.perf_counter()
+    dm = DataManager(panel_cache=True)
+    dm.get_weekly_data()
+    print(f"Loaded market data once in {time.perf_counter() - load_start:.2f}s")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers or len(descriptions), initializer=_init_worker) as pool:
+        futures = {pool.submit(_run_strategy, desc, DataManager.WEEKLY_PANEL_DIR, scan_mode, metrics.enabled, panel_mode): desc for desc in descriptions}
+        for future in as_completed(futures):
+            desc = futures[future]
+            try:
+                results[desc] = future.result()
+            except Exception as e:
+                results[desc] = (desc, False, 0.0, f"worker crashed: {e}")
+            _, ok, seconds, error = results[desc]
+            print(f"[{desc}] {'done' if ok else 'FAILED'} in {seconds:.2f}s")
+            if error:
+                print(error)
+
+    ordered = [results[desc] for desc in descriptions]
+    print("\n--- Strategy timings ---")
+    for desc, ok, seconds, _ in ordered:
+        print(f"  {desc:<12} {'ok' if ok else 'failed':<7} {seconds:8.2f}s")
+    return ordered
+
+#===========================================
@@ -0,0 +1,69 @@
+import queue
+import threading
+
+#===========================================
+# Streaming helpers for the data -> strategy pipeline.
+#===========================================
+
+def prefetch(iterable, size=64):
+    """
+    Runs `iterable` on a background thread and yields its items through a
+    bounded queue.
+
+    The producer (e.g. loading or downloading tickers) keeps working while the
+    consumer processes the items it already has. Once `size` items are waiting
+    the producer blocks, so a slow consumer bounds memory instead of letting
+    the whole universe pile up. Exceptions raised by the producer are re-raised
+    in the consumer. When the consumer stops early the producer is stopped and
+    its generator closed, so its cleanup (e.g. saving partial results) runs.
+
+    Args:
+        iterable (iterable): Source of items, typically a generator.
+        size (int, optional): Maximum number of items waiting in the queue.
+
+    Yields:
+        The items of `iterable`, in order.
+    """
+    items = queue.Queue(maxsize=max(1, int(size)))
+    stop = threading.Event()
+
+    def put(entry):
+        # gives up once the consumer has gone away
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        source = iter(iterable)
+        error = None
+        try:
+            for item in source:
+                if not put((True, item)):
+                    break
+        except BaseException as e:
+            error = e
+        finally:
+            close = getattr(source, 'close', None)
+            if close:
+                close()
+        put((False, error))
+
+    thread = threading.Thread(target=produce, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            is_item, value = items.get()
+            if not is_item:
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        stop.set()
+        thread.join()
+
+#===========================================
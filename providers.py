@@ -0,0 +1,261 @@
+import json
+import os
+import random
+import threading
+import time
+
+import pandas as pd
+from instrumentation import metrics
+
+#===========================================
+# Market data providers.
+# DataManager gets its ticker list and bars from a provider: DataDownloader
+# (Wikipedia + yfinance) by default. RecordingProvider saves whatever another
+# provider returns to a directory and ReplayProvider serves such a recording
+# back without the network, so whole runs can be repeated offline.
+#===========================================
+
+class RateLimitError(Exception):
+    """Raised by the simulated providers to mimic an HTTP 429 response."""
+    status_code = 429
+
+#===========================================
+
+class MarketDataProvider:
+    """
+    Interface of a market data source.
+
+    Subclasses implement fetch_historic_data, and fetch_tickers when they know
+    the universe. Network errors propagate from the fetch_* methods so callers
+    such as ConcurrentDownloader can retry them. iter_download_many swallows
+    them instead and records the tickers it could not fetch in self.failed as
+    (ticker, error) tuples, like ConcurrentDownloader.
+    """
+    failed = ()
+
+    def fetch_tickers(self):
+        """
+        Returns:
+            list: The universe's ticker symbols.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no ticker list")
+
+    def fetch_historic_data(self, ticker, span="1y", interval="1d", start=None, end=None):
+        """
+        Returns:
+            pd.DataFrame: OHLCV bars shaped like yfinance's Ticker.history(),
+                          empty when there is no data. When start ('YYYY-MM-DD',
+                          optionally with an exclusive end) is given it is used
+                          instead of span.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no historic data")
+
+    def iter_download_many(self, tickers, span="1y", interval="1d", batch_size=100, start=None, end=None):
+        """
+        Yields (ticker, df) for every ticker with data. This default fetches one
+        ticker at a time; providers with a batch endpoint override it.
+        """
+        self.failed = []
+        for ticker in tickers:
+            try:
+                df = self.fetch_historic_data(ticker, span=span, interval=interval, start=start, end=end)
+            except Exception as e:
+                print(f"An error occurred while downloading data for {ticker}: {e}")
+                self.failed.append((ticker, str(e)))
+                continue
+            if df is not None and not df.empty:
+                yield ticker, df
+
+    def download_many(self, tickers, span="1y", interval="1d", batch_size=100, start=None, end=None):
+        """
+        Returns:
+            list: (ticker, pd.DataFrame) tuples of iter_download_many.
+        """
+        return list(self.iter_download_many(tickers, span=span, interval=interval,
+                                            batch_size=batch_size, start=start, end=end))
+
+#===========================================
+
+class Recording:
+    """
+    On-disk provider responses: <record_dir>/tickers.json and one pickled
+    frame per <interval>/<ticker>.pkl. Frames are pickled so replayed data has
+    exactly the index, time zone and dtypes of the recorded responses.
+    """
+    TICKERS_FILE = "tickers.json"
+
+    def __init__(self, record_dir):
+        self.record_dir = record_dir
+        self._lock = threading.Lock()
+
+    def _path(self, interval, ticker):
+        return os.path.join(self.record_dir, interval, f"{ticker}.pkl")
+
+    #===========================================
+
+    def save_tickers(self, tickers):
+        os.makedirs(self.record_dir, exist_ok=True)
+        with open(os.path.join(self.record_dir, self.TICKERS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(list(tickers), f, indent=4)
+
+    def load_tickers(self):
+        """
+        Returns:
+            list: The recorded ticker list, else every ticker with recorded bars.
+        """
+        path = os.path.join(self.record_dir, self.TICKERS_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        tickers = set()
+        if os.path.isdir(self.record_dir):
+            for interval in os.listdir(self.record_dir):
+                folder = os.path.join(self.record_dir, interval)
+                if os.path.isdir(folder):
+                    tickers.update(name[:-4] for name in os.listdir(folder) if name.endswith(".pkl"))
+        return sorted(tickers)
+
+    #===========================================
+
+    def save(self, ticker, interval, df):
+        """
+        Adds a response to the ticker's recorded bars. Bars in both replace
+        the recorded ones, so refreshed tails and re-adjusted histories win.
+        """
+        if df is None or df.empty:
+            return
+        path = self._path(interval, ticker)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                old = pd.read_pickle(path)
+                df = pd.concat([old[~old.index.isin(df.index)], df]).sort_index()
+            df.to_pickle(path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+    def load(self, ticker, interval, start=None, end=None):
+        """
+        Returns:
+            pd.DataFrame or None: The recorded bars from start to the exclusive
+                                  end, or None if nothing was recorded.
+        """
+        path = self._path(interval, ticker)
+        if not os.path.exists(path):
+            return None
+        df = pd.read_pickle(path)
+        tz = df.index.tz
+        if start:
+            df = df[df.index >= pd.Timestamp(start, tz=tz)]
+        if end:
+            df = df[df.index < pd.Timestamp(end, tz=tz)]
+        return df
+
+#===========================================
+
+class RecordingProvider(MarketDataProvider):
+    """
+    Passes every call on to `provider` (default DataDownloader) and records
+    the ticker list and bars it returns into `record_dir`.
+    """
+
+    def __init__(self, record_dir, provider=None):
+        if provider is None:
+            from download_helper import DataDownloader
+            provider = DataDownloader()
+        self.provider = provider
+        self.recording = Recording(record_dir)
+
+    @property
+    def failed(self):
+        return getattr(self.provider, 'failed', ())
+
+    def fetch_tickers(self):
+        tickers = self.provider.fetch_tickers()
+        self.recording.save_tickers(tickers)
+        return tickers
+
+    def fetch_historic_data(self, ticker, span="1y", interval="1d", start=None, end=None):
+        df = self.provider.fetch_historic_data(ticker, span=span, interval=interval, start=start, end=end)
+        self.recording.save(ticker, interval, df)
+        return df
+
+    def iter_download_many(self, tickers, span="1y", interval="1d", batch_size=100, start=None, end=None):
+        for ticker, df in self.provider.iter_download_many(tickers, span=span, interval=interval,
+                                                           batch_size=batch_size, start=start, end=end):
+            self.recording.save(ticker, interval, df)
+            yield ticker, df
+
+#===========================================
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves a recording made by RecordingProvider without the network.
+
+    Requests are answered from the ticker's recorded bars, cut to start/end.
+    A span is not applied, so a recording replays the same bars on any day.
+    Tickers that were not recorded come back empty (like unknown symbols on
+    yfinance), or raise KeyError with strict=True. `latency` seconds are
+    slept per request (per batch for iter_download_many), and requests fail
+    with RateLimitError with probability `error_rate`, from a seeded RNG.
+    """
+
+    def __init__(self, record_dir, latency=0.0, error_rate=0.0, seed=0, strict=False):
+        if not os.path.isdir(record_dir):
+            raise FileNotFoundError(f"No recording found at {record_dir}")
+        self.recording = Recording(record_dir)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.strict = strict
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fetch_tickers(self):
+        return self.recording.load_tickers()
+
+    def fetch_historic_data(self, ticker, span="1y", interval="1d", start=None, end=None):
+        self._simulate_(ticker)
+        return self._replay_(ticker, interval, start, end)
+
+    def iter_download_many(self, tickers, span="1y", interval="1d", batch_size=100, start=None, end=None):
+        self.failed = []
+        tickers = list(tickers)
+        batch_size = max(1, int(batch_size))
+        for i in range(0, len(tickers), batch_size):
+            batch = tickers[i:i + batch_size]
+            metrics.count('network.requests')
+            try:
+                with metrics.span('download.batch'):
+                    self._simulate_(f"batch starting at {batch[0]}")
+            except RateLimitError as e:
+                print(f"An error occurred while downloading batch starting at {batch[0]}: {e}")
+                metrics.count('network.failures')
+                self.failed.extend((ticker, str(e)) for ticker in batch)
+                continue
+            for ticker in batch:
+                df = self._replay_(ticker, interval, start, end)
+                if df.empty:
+                    print(f"Warning: No data found for ticker '{ticker}' for the given period.")
+                    continue
+                yield ticker, df
+
+    #===========================================
+
+    def _simulate_(self, what):
+        with self._lock:
+            self.calls += 1
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise RateLimitError(f"429 Too Many Requests for {what}")
+
+    def _replay_(self, ticker, interval, start, end):
+        df = self.recording.load(ticker, interval, start, end)
+        if df is None:
+            if self.strict:
+                raise KeyError(f"No recorded {interval} bars for {ticker}")
+            return pd.DataFrame()
+        return df
+
+#===========================================
@@ -1,10 +1,13 @@
+import atexit
 import sqlite3
+import threading
 import pandas as pd
 import os
 from utility import get_date_mmddyyyy
 from dataclasses import dataclass
+from instrumentation import metrics
 
-@dataclass
+@dataclass(slots=True)
 class TradeParams:
     timestamp: str
     ticker: str
@@ -16,54 +19,63 @@ class TradeParams:
 
 class SetupLogger:
     DB_PATH = os.path.join("reports", f"trade_setups_{get_date_mmddyyyy()}.db")
+    FLUSH_SIZE = 100        # flush once this many setups are buffered
+    FLUSH_INTERVAL = 5.0    # or by a timer once the oldest buffered setup is this many seconds old
+
+    _session = None
+    _session_lock = threading.Lock()
 
     @staticmethod
     def clear_sameday_setup_log():
-        if os.path.exists(SetupLogger.DB_PATH):
-            os.remove(SetupLogger.DB_PATH)
+        SetupLogger.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(SetupLogger.DB_PATH + suffix):
+                os.remove(SetupLogger.DB_PATH + suffix)
 
     @staticmethod
-    def _create_tables():
-        os.makedirs(os.path.dirname(SetupLogger.DB_PATH), exist_ok=True)
-        conn = sqlite3.connect(SetupLogger.DB_PATH)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS buy_setups (
-                timestamp TEXT,
-                ticker TEXT,
-                timeframe TEXT,
-                entry REAL,
-                stop REAL,
-                tp REAL,
-                strategy TEXT
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sell_setups (
-                timestamp TEXT,
-                ticker TEXT,
-                timeframe TEXT,
-                entry REAL,
-                stop REAL,
-                tp REAL,
-                strategy TEXT
-            )
-        ''')
-        conn.commit()
-        conn.close()
+    def session():
+        """
+        Returns this process's logging session, opening it on first use.
+        A forked child never reuses its parent's connection.
+        """
+        with SetupLogger._session_lock:
+            session = SetupLogger._session
+            if session is None or session.pid != os.getpid():
+                session = _SetupLogSession(SetupLogger.DB_PATH)
+                SetupLogger._session = session
+            return session
 
     @staticmethod
-    def build_trade_params(row, ticker, strategy: str, buy: bool):
+    def flush():
+        if SetupLogger._session is not None and SetupLogger._session.pid == os.getpid():
+            SetupLogger._session.flush()
+
+    @staticmethod
+    def close():
+        with SetupLogger._session_lock:
+            session = SetupLogger._session
+            SetupLogger._session = None
+        if session is not None and session.pid == os.getpid():
+            session.close()
+
+    @staticmethod
+    def trade_levels(high, low, buy: bool):
+        """
+        Entry, stop and target of a setup bar: a stop entry beyond the bar,
+        the stop at its other end and a 1R target. Works on scalars and arrays.
+
+        Returns:
+            tuple: (entry, stop, tp)
+        """
         if buy:
-            entry = row['High']
-            stop = row['Low']
-            tp = entry + (entry - stop)
-        else:
-            entry = row['Low']
-            stop = row['High']
-            tp = entry - (stop - entry)
+            entry, stop = high, low
+            return entry, stop, entry + (entry - stop)
+        entry, stop = low, high
+        return entry, stop, entry - (stop - entry)
+
+    @staticmethod
+    def build_trade_params(row, ticker, strategy: str, buy: bool):
+        entry, stop, tp = SetupLogger.trade_levels(row['High'], row['Low'], buy)
            
         # Extract timestamp from the row's index (which is a DatetimeIndex)
         timestamp_str = row.name.strftime('%Y-%m-%d %H:%M:%S') # Format as string
@@ -72,33 +84,109 @@ class SetupLogger:
             timestamp=timestamp_str,
             ticker=ticker, # Ticker needs to be passed from process_strat_F2_setups
             timeframe="Weekly",
-            entry=round(entry, 4),
-            stop=round(stop, 4),
-            tp=round(tp, 4),
+            entry=round(float(entry), 4),
+            stop=round(float(stop), 4),
+            tp=round(float(tp), 4),
             strategy=strategy
         )
         return setup_params
 
     @staticmethod
     def log_buy_setup(setup: TradeParams):
-        SetupLogger._create_tables() # Ensure tables exist
-        conn = sqlite3.connect(SetupLogger.DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO buy_setups (timestamp, ticker, timeframe, entry, stop, tp, strategy)
-            VALUES (?, ?, ?, ?, ?, ?, ?) 
-        ''', (setup.timestamp, setup.ticker, setup.timeframe, setup.entry, setup.stop, setup.tp, setup.strategy))
-        conn.commit()
-        conn.close()
+        SetupLogger.session().add('buy_setups', setup)
 
     @staticmethod
     def log_sell_setup(setup: TradeParams):
-        SetupLogger._create_tables() # Ensure tables exist
-        conn = sqlite3.connect(SetupLogger.DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO sell_setups (timestamp, ticker, timeframe, entry, stop, tp, strategy)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (setup.timestamp, setup.ticker, setup.timeframe, setup.entry, setup.stop, setup.tp, setup.strategy))
-        conn.commit()
-        conn.close()
+        SetupLogger.session().add('sell_setups', setup)
+
+#===========================================
+
+class _SetupLogSession:
+    """
+    One SQLite connection per process for the whole run.
+
+    Setups are buffered and written with executemany in a single transaction
+    when the buffer is full, on flush/close, or by a background timer that
+    fires FLUSH_INTERVAL seconds after the first buffered setup, so rows reach
+    the file even when no more setups arrive. WAL mode and
+    a busy timeout let several worker processes append to the same file;
+    a lock makes the session safe to share between threads.
+    """
+
+    def __init__(self, db_path):
+        self.pid = os.getpid()
+        self.db_path = db_path
+        self._conn = None
+        self._connect()
+        self._buffer = {'buy_setups': [], 'sell_setups': []}
+        self._buffered = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        with self._conn:
+            for table in ('buy_setups', 'sell_setups'):
+                self._conn.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        timestamp TEXT,
+                        ticker TEXT,
+                        timeframe TEXT,
+                        entry REAL,
+                        stop REAL,
+                        tp REAL,
+                        strategy TEXT
+                    )
+                ''')
+
+    def add(self, table, setup: TradeParams):
+        with self._lock:
+            self._buffer[table].append((setup.timestamp, setup.ticker, setup.timeframe,
+                                        setup.entry, setup.stop, setup.tp, setup.strategy))
+            self._buffered += 1
+            if self._buffered >= SetupLogger.FLUSH_SIZE:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(SetupLogger.FLUSH_INTERVAL, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffered:
+            return
+        if self._conn is None:
+            # a thread still holding the session logged after close(); reopen to keep the rows
+            self._connect()
+        metrics.count('setup_log.rows', self._buffered)
+        with metrics.span('setup_log.flush'), self._conn:
+            for table, rows in self._buffer.items():
+                if rows:
+                    self._conn.executemany(f'''
+                        INSERT INTO {table} (timestamp, ticker, timeframe, entry, stop, tp, strategy)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', rows)
+                    rows.clear()
+        self._buffered = 0
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# one handler for the whole process; it closes whichever session is current at exit
+atexit.register(SetupLogger.close)
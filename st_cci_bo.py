@@ -1,11 +1,11 @@
-import matplotlib.pyplot as plt
-import mplfinance as mpf
-from matplotlib.backends.backend_pdf import PdfPages
 import pandas as pd
 import numpy as np
 from st_strategy_base import BaseStrategy
+from chart_renderer import ChartJob, ChartStream
+from ohlc_panel import OHLCPanel
 from setup_helper import TradeParams
 import utility
+import indicators
 from setup_helper import SetupLogger
 
 #===========================================
@@ -16,6 +16,9 @@ It generates buy and sell signals based on the CCI values crossing above or belo
 """
 class CCIBO(BaseStrategy):
     def __init__(self, *args, **kwargs):
+        # Only initialize once per singleton instance
+        if hasattr(self, '_dm_'):
+            return
         super().__init__(*args, **kwargs)
         self.cci_span = 34
         self.cci_up_threshold = 100
@@ -31,11 +34,12 @@ class CCIBO(BaseStrategy):
     def process_data(self):
         # Implement the logic to process the data for CCI BO strategy
         print(self.__str__())
-        basedata = self.fetch_data_collection()
-        with PdfPages(f'reports/SP500_Weekly_CCI_BO_buy_setups_{utility.get_date_mmddyyyy()}.pdf') as buy_pdf, \
-             PdfPages(f'reports/SP500_Weekly_CCI_BO_sell_setups_{utility.get_date_mmddyyyy()}.pdf') as sell_pdf:
-            for ticker, df in basedata:
-                df = self._calculate_cci_params(df)
+        buy_pdf = f'reports/SP500_Weekly_CCI_BO_buy_setups_{utility.get_date_mmddyyyy()}.pdf'
+        sell_pdf = f'reports/SP500_Weekly_CCI_BO_sell_setups_{utility.get_date_mmddyyyy()}.pdf'
+        # charts render in the background while the scan goes on
+        with ChartStream() as charts:
+            for ticker, data in self.stream_data_collection():
+                df = self.evaluate(ticker, self.scan_window(data))
                 #gather last 2 rows
                 dftail = df.tail(2)
 
@@ -43,28 +47,32 @@ class CCIBO(BaseStrategy):
                 if dftail.iloc[-1]['Mode'] == 'BUY' and dftail.iloc[-2]['Mode'] != 'BUY':
                     tparams = SetupLogger.build_trade_params(last_row, ticker, 'CCIBO', buy=True)
                     self.log_buy_setup(tparams)
-
-                    img = self._plot_cci_chart(ticker, 'Buy', df)
-                    buy_pdf.savefig(img)
-                    plt.close(img)
+                    charts.add(buy_pdf, ChartJob(CCIBO._plot_cci_chart, ticker, 'Buy', self.full_evaluation(ticker, data, df)))
                 elif dftail.iloc[-1]['Mode'] == 'SELL' and dftail.iloc[-2]['Mode'] != 'SELL':
                     tparams = SetupLogger.build_trade_params(last_row, ticker, 'CCIBO', buy=False)
                     self.log_sell_setup(tparams)
-
-                    img = self._plot_cci_chart(ticker, 'Sell', df)
-                    sell_pdf.savefig(img)
-                    plt.close(img)
+                    charts.add(sell_pdf, ChartJob(CCIBO._plot_cci_chart, ticker, 'Sell', self.full_evaluation(ticker, data, df)))
 
     #===========================================
 
-    def _calculate_cci_params(self, df: pd.DataFrame):
+    @property
+    def lookback(self):
+        # the last two CCI values
+        return self.cci_span + 1
+
+    def evaluate(self, ticker, df: pd.DataFrame):
+        return self._calculate_cci_params(df.copy(), ticker)
+
+    def _calculate_cci_params(self, df: pd.DataFrame, ticker=None):
         # Implement the logic to calculate CCI parameters
         #print("Calculating CCI parameters")
-        df['Typical Price'] = (df['High'] + df['Low'] + df['Close']) / 3
-        df['SMA_CCI'] = df['Typical Price'].rolling(window=self.cci_span).mean()
-        df['EMA20'] = df['Close'].ewm(span=20, adjust=False).mean()
-        df['Mean Deviation'] = df['Typical Price'].rolling(window=self.cci_span).apply(lambda x: (x - x.mean()).abs().mean())
-        df['CCI'] = (df['Typical Price'] - df['SMA_CCI']) / (0.015 * df['Mean Deviation'])
+        # indicators are shared with other strategies through the session cache
+        cache = indicators.indicator_cache
+        df['Typical Price'] = cache.typical_price(ticker, df)
+        df['SMA_CCI'] = cache.sma(ticker, df, self.cci_span, column='Typical Price')
+        df['EMA20'] = cache.ema(ticker, df, 20)
+        df['Mean Deviation'] = cache.mean_deviation(ticker, df, self.cci_span)
+        df['CCI'] = cache.cci(ticker, df, self.cci_span)
         conditions = [
             df['CCI'] > self.cci_up_threshold,
             df['CCI'] < self.cci_down_threshold
@@ -76,7 +84,33 @@ class CCIBO(BaseStrategy):
     
     #===========================================
 
-    def _plot_cci_chart(self, ticker: str, setup: str, df: pd.DataFrame):
+    def scan_panel(self, panel: OHLCPanel):
+        # the last two CCI values only need the last cci_span + 1 bars
+        tail = slice(-(self.cci_span + 1), None)
+        cci = indicators.cci_2d(panel.high[:, tail], panel.low[:, tail], panel.close[:, tail], self.cci_span)
+        if cci.shape[1] < 2:
+            return [], []
+        last, prev = cci[:, -1], cci[:, -2]
+        buy = (last > self.cci_up_threshold) & ~(prev > self.cci_up_threshold)
+        sell = (last < self.cci_down_threshold) & ~(prev < self.cci_down_threshold)
+        return panel.select(buy), panel.select(sell)
+
+    def signal_panel(self, panel: OHLCPanel):
+        cci = indicators.cci_2d(panel.high, panel.low, panel.close, self.cci_span)
+        buy = np.zeros(cci.shape, dtype=bool)
+        sell = np.zeros(cci.shape, dtype=bool)
+        last, prev = cci[:, 1:], cci[:, :-1]
+        # a crossing needs a previous CCI value, like the last two rows in process_data
+        with np.errstate(invalid='ignore'):
+            buy[:, 1:] = (last > self.cci_up_threshold) & (prev <= self.cci_up_threshold)
+            sell[:, 1:] = (last < self.cci_down_threshold) & (prev >= self.cci_down_threshold)
+        return buy, sell
+
+    #===========================================
+
+    @staticmethod
+    def _plot_cci_chart(ticker: str, setup: str, df: pd.DataFrame):
+        import mplfinance as mpf
         plot_df = df[['Open', 'High', 'Low', 'Close', 'EMA20', 'CCI']]
         apds = [
             mpf.make_addplot(plot_df['EMA20'], color='blue', width=1),
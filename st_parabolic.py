@@ -1,11 +1,10 @@
-from matplotlib.backends.backend_pdf import PdfPages
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import os
 import utility
-from data_manager import DataManager
 from setup_helper import SetupLogger, TradeParams
 from st_strategy_base import BaseStrategy
+from ohlc_panel import OHLCPanel
 
 #===========================================
 
@@ -14,32 +13,39 @@ class Parabolic(BaseStrategy):
     Processes and visualizes trading strategies based on the S&P 500 data.
     """
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, *args, **kwargs):
+        # Only initialize once per singleton instance
+        if hasattr(self, '_dm_'):
+            return
+        super().__init__(*args, **kwargs)
         print("Initializing Parabolic Strategy")
+        self._high_data = {}
 
     #===========================================
 
     def __str__(self):
         return "parabolic"
 
+    # only the last close is compared with the yearly high
+    lookback = 1
+
     #===========================================
 
     def process_data(self):
-        basedata = self.fetch_data_collection()
         print("getting close data")
-        back_date = pd.to_datetime(utility.get_back_date(10, 0, 0))
+        back_date = self._back_date()
         #close_data = self.dm.get_close_on_date(back_date)
 
-        high_data = self.dm.get_yearly_high(back_date.year)
+        high_data = self._get_yearly_high(back_date.year)
 
         print(f"entries on {back_date}: {len(high_data)}")
         #print(close_data)
         beaten = []
         fallen = []
-        for ticker, df in basedata:
+        report_lines = []
+        for ticker, df in self.stream_data_collection():
             #print(ticker)
-            hist_high = next((v for t, v in high_data if t == ticker), None)            
+            hist_high = high_data.get(ticker)
             if hist_high:
                 last_close = df.iloc[-1]['Close']
                 last_close = float(last_close)
@@ -50,14 +56,36 @@ class Parabolic(BaseStrategy):
                 if last_close < (float(hist_high) * 0.20):
                     beaten.append((ticker, df))
                     print(f"{ticker} is beaten down")
-                    with open(os.path.join("reports", "sp500", "beaten_down_stocks.txt"), "a+") as f:
-                        f.writelines([f"scanned on {utility.get_date_mmddyyyy()}: {ticker}, historic high ({back_date.year}): {round(hist_high, 4)}, last close: {round(last_close, 4)}\n"])
+                    report_lines.append(f"scanned on {utility.get_date_mmddyyyy()}: {ticker}, historic high ({back_date.year}): {round(hist_high, 4)}, last close: {round(last_close, 4)}\n")
+
+        if report_lines:
+            with open(os.path.join("reports", "sp500", "beaten_down_stocks.txt"), "a+") as f:
+                f.writelines(report_lines)
 
         print(f"Total beaten down stocks: {len(beaten)}")
         print([t for t, d in beaten])
 
 
 
+    #===========================================
+
+    def scan_panel(self, panel: OHLCPanel):
+        highs = self._get_yearly_high(self._back_date().year)
+        hist_high = np.array([highs.get(ticker) or np.nan for ticker in panel.tickers], dtype=np.float64)
+        beaten = panel.close[:, -1] < hist_high * 0.20
+        return panel.select(beaten), []
+
+    #===========================================
+
+    def _back_date(self):
+        return pd.to_datetime(utility.get_back_date(10, 0, 0))
+
+    def _get_yearly_high(self, year):
+        # fetched once per year per session, shared by scan_panel and process_data
+        if year not in self._high_data:
+            self._high_data[year] = self.dm.get_yearly_high(year)
+        return self._high_data[year]
+
     #===========================================
 
     def generate_reports(self):
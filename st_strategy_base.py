@@ -1,21 +1,26 @@
 from abc import ABC, abstractmethod
 import pandas as pd
 
-import time
 from functools import wraps
-from data_manager import DataManager
 from setup_helper import TradeParams
+from ohlc_panel import OHLCPanel
+from instrumentation import metrics
+import indicators
 
 #===========================================
 
 def timeit(method):
-    @wraps(method)
-    def timed(*args, **kwargs):
-        start_time = time.time()
-        result = method(*args, **kwargs)
-        elapsed = time.time() - start_time
-        print(f"[{method.__qualname__}] executed in {elapsed:.4f}s")
-        return result
+    """Records every call of `method` as a span named after it (see instrumentation.metrics)."""
+    return metrics.timed()(method)
+
+def _signal_span(evaluate):
+    """Records evaluate(ticker, df) calls as per-ticker '<Strategy>.signal' spans."""
+    @wraps(evaluate)
+    def timed(self, ticker, df):
+        if not metrics.enabled:
+            return evaluate(self, ticker, df)
+        with metrics.span(f"{self}.signal", ticker):
+            return evaluate(self, ticker, df)
     return timed
 
 #===========================================
@@ -23,15 +28,35 @@ def timeit(method):
 class BaseStrategy(ABC):
     _instances = {}
 
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         if cls not in cls._instances:
             cls._instances[cls] = super(BaseStrategy, cls).__new__(cls)
         return cls._instances[cls]
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # overrides drop the decorators of the base methods; instrument them here
+        if 'process_data' in cls.__dict__:
+            cls.process_data = timeit(cls.__dict__['process_data'])
+        if 'evaluate' in cls.__dict__:
+            cls.evaluate = _signal_span(cls.__dict__['evaluate'])
+
     def __init__(self, *args, **kwargs):
         # Only initialize once per singleton instance
-        if not hasattr(self, 'dm'):
-            self.dm = kwargs.get('dm', DataManager())
+        if not hasattr(self, '_dm_'):
+            self._dm_ = kwargs.get('dm')
+
+    @property
+    def dm(self):
+        """The strategy's DataManager, created on first use."""
+        if self._dm_ is None:
+            from data_manager import DataManager
+            self._dm_ = DataManager()
+        return self._dm_
+
+    @dm.setter
+    def dm(self, dm):
+        self._dm_ = dm
 
     @timeit
     @abstractmethod
@@ -56,6 +81,68 @@ class BaseStrategy(ABC):
     def __str__(self):
         return self.__class__.__name__
 
+    # When True, fetch_data_collection only returns the tickers that scan_panel
+    # says fire on the last bar, so the per-ticker work runs for those alone.
+    panel_mode = False
+
+    # Number of trailing bars the signal on the last bar depends on (None: the
+    # whole history). With scan_mode on, signals are evaluated over this tail
+    # only and the full history is processed just for the tickers that fire.
+    lookback = None
+    scan_mode = False
+
+    # Chunked mode: with a shard size or a memory budget (MB) the universe is
+    # streamed shard by shard (DataManager.iter_shards) and released after each.
+    shard_size = None
+    memory_budget_mb = None
+
+    def evaluate(self, ticker, df: pd.DataFrame):
+        """
+        Computes the strategy's indicator/label columns for one ticker.
+
+        Returns:
+            pd.DataFrame: A new frame with the added columns; the last row carries the signal.
+        """
+        raise NotImplementedError(f"{self} has no evaluate")
+
+    def scan_window(self, df: pd.DataFrame):
+        """Returns the tail of df that evaluate needs in scan mode (all of df otherwise)."""
+        if not self.scan_mode or self.lookback is None or len(df) <= self.lookback:
+            return df
+        return df.iloc[-self.lookback:]
+
+    def full_evaluation(self, ticker, data: pd.DataFrame, evaluated: pd.DataFrame):
+        """
+        Returns evaluate() over the whole history `data`, reusing `evaluated`
+        when it already covers it. Used for charts of tickers that fired in scan mode.
+        """
+        if len(self.scan_window(data)) == len(data):
+            return evaluated
+        return self.evaluate(ticker, data)
+
+    def scan_panel(self, panel: OHLCPanel):
+        """
+        Evaluates the strategy's signal for the whole universe in one vectorized pass.
+
+        Args:
+            panel (OHLCPanel): Aligned (tickers x bars) OHLC arrays.
+
+        Returns:
+            tuple: (buy_tickers, sell_tickers) firing on the last bar.
+        """
+        raise NotImplementedError(f"{self} has no panel scan")
+
+    def signal_panel(self, panel: OHLCPanel):
+        """
+        Evaluates the strategy's signal on every bar of every ticker at once,
+        e.g. for backtests.
+
+        Returns:
+            tuple: (buy, sell) boolean (tickers x bars) arrays; True where a
+                   setup fires on that bar.
+        """
+        raise NotImplementedError(f"{self} has no signal panel")
+
     @timeit
     def fetch_data_collection(self):
         """
@@ -63,5 +150,50 @@ class BaseStrategy(ABC):
         """
         
         collection = self.dm.get_weekly_data()
+        if self.panel_mode:
+            buy, sell = self._scan_aligned_(self.dm.get_weekly_panel())
+            fired = set(buy) | set(sell)
+            collection = [(ticker, df) for ticker, df in collection if ticker in fired]
+            print(f"[{self}] panel scan: {len(buy)} buy, {len(sell)} sell")
         return collection 
+
+    def stream_data_collection(self):
+        """
+        Yields the strategy's (ticker, df) data as each ticker becomes available,
+        so the per-ticker work overlaps with loading and downloading.
+        Panel mode needs the whole universe for its scan first, so it yields
+        the (filtered) fetch_data_collection instead. In chunked mode the
+        universe comes shard by shard (panel scans run per shard) and nothing
+        of a shard is kept once the next one is requested.
+        """
+        if self.shard_size or self.memory_budget_mb:
+            yield from self._iter_sharded_()
+        elif self.panel_mode:
+            yield from self.fetch_data_collection()
+        else:
+            yield from self.dm.stream_weekly_data()
+
+    def _scan_aligned_(self, panel: OHLCPanel):
+        """
+        scan_panel on each ticker's own last bar, like the per-ticker path:
+        tickers whose data ends before the panel's last date are aligned on
+        their last bar (OHLCPanel.align_last) instead of reading NaN there.
+        """
+        stale = panel.stale_tickers()
+        if stale:
+            print(f"[{self}] panel scan: {len(stale)} tickers end before {panel.dates[-1].date()}, "
+                  f"scanned on their own last bar: {', '.join(stale[:10])}{' ...' if len(stale) > 10 else ''}")
+        return self.scan_panel(panel.align_last())
+
+    def _iter_sharded_(self):
+        for shard in self.dm.iter_shards('weekly', shard_size=self.shard_size,
+                                         memory_budget_mb=self.memory_budget_mb):
+            if self.panel_mode:
+                buy, sell = self._scan_aligned_(OHLCPanel.from_frames(shard))
+                fired = set(buy) | set(sell)
+                shard = [(ticker, df) for ticker, df in shard if ticker in fired]
+            yield from shard
+            # the next shard has other tickers, so nothing cached for this one is hit again
+            indicators.indicator_cache.clear()
+            del shard
 #===========================================
\ No newline at end of file
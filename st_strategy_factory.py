@@ -1,28 +1,39 @@
-from st_thestrat import TheStrat
-from st_zindex import ZIndex
-from st_cci_bo import CCIBO
-from st_parabolic import Parabolic
+import importlib
 #===========================================
 
 class StrategyFactory:
-    _strategies = [
-        (str(TheStrat()), TheStrat()),
-        (str(ZIndex()), ZIndex()),
-        (str(CCIBO()), CCIBO()),
-        (str(Parabolic()), Parabolic()),
-    ]
+    """
+    Lazy registry of the strategies.
+
+    Strategies are registered by description with the module and class that
+    implement them. Nothing is imported or constructed until a strategy is
+    requested, so listing the strategies is free and running one strategy
+    does not import the others (or their plotting dependencies).
+    """
+    # description -> (module, class name)
+    _registry = {
+        "TheStrat": ("st_thestrat", "TheStrat"),
+        "ZIndex": ("st_zindex", "ZIndex"),
+        "CCIBO": ("st_cci_bo", "CCIBO"),
+        "parabolic": ("st_parabolic", "Parabolic"),
+    }
+
+    @classmethod
+    def register(cls, description, module, class_name):
+        cls._registry[description] = (module, class_name)
 
     @classmethod
     def list_descriptions(cls):
-        return [desc for desc, _ in cls._strategies]
+        return list(cls._registry)
 
     @classmethod
     def get_instance_by_description(cls, description):
-        for desc, instance in cls._strategies:
-            if desc == description:
-                return instance
-        raise ValueError(f"No strategy matches description: {description}")
+        if description not in cls._registry:
+            raise ValueError(f"No strategy matches description: {description}")
+        module, class_name = cls._registry[description]
+        # strategies are singletons, so repeated lookups return the same instance
+        return getattr(importlib.import_module(module), class_name)()
 
     @classmethod
     def get_all_instances(cls):
-        return [instance for _, instance in cls._strategies]
+        return [cls.get_instance_by_description(desc) for desc in cls._registry]
@@ -1,134 +1,149 @@
+import numpy as np
 import pandas as pd
 
-import matplotlib.pyplot as plt
-import mplfinance as mpf
-from matplotlib.backends.backend_pdf import PdfPages
 from setup_helper import TradeParams
 from setup_helper import SetupLogger
 import utility
 from st_strategy_base import BaseStrategy
+from chart_renderer import ChartJob, ChartStream
+from ohlc_panel import OHLCPanel
 #===========================================
+# BarType codes. 0 means no label (first bar, NaNs or equal highs/lows).
+BAR_TYPES = np.array([None, '1', '3', '2u', '2d'], dtype=object)
+# StratSequence lookup, indexed by code[i-2] * 25 + code[i-1] * 5 + code[i]
+SEQUENCES = np.array([None if 0 in (a, b, c) else '_'.join(BAR_TYPES[[a, b, c]])
+                      for a in range(5) for b in range(5) for c in range(5)], dtype=object)
+
+# The label columns are categoricals (one byte per bar instead of a Python
+# object); a missing BarType / StratSequence / Combo_Label is NaN.
+BAR_TYPE_DTYPE = pd.CategoricalDtype(BAR_TYPES[1:].tolist())
+SEQUENCE_DTYPE = pd.CategoricalDtype([seq for seq in SEQUENCES if seq is not None])
+WICK_DTYPE = pd.CategoricalDtype(['', 'f2d', 'f2u'])
+COMBO_DTYPE = pd.CategoricalDtype(['f2d', 'f2u'] + BAR_TYPES[1:].tolist())
+# category code of every SEQUENCES entry (-1 for None)
+SEQUENCE_CODES = np.array([-1 if seq is None else SEQUENCE_DTYPE.categories.get_loc(seq)
+                           for seq in SEQUENCES], dtype=np.int8)
 
 class TheStrat(BaseStrategy):
-    def __init__(self):
-        super().__init__()
-        
-
     def __str__(self):
         return "TheStrat"
 
     def process_data(self):
-        basedata = self.fetch_data_collection()
-        with PdfPages(f'reports/SP500_Weekly_F2_buy_setups_{utility.get_date_mmddyyyy()}.pdf') as buy_pdf, \
-             PdfPages(f'reports/SP500_Weekly_F2_sell_setups_{utility.get_date_mmddyyyy()}.pdf') as sell_pdf:
-            for ticker, data in basedata:
-                df = data.copy()
-                df = self.assign_strat_codes(df)
-                
-                last_wick_label = df['Wick_Label'].iloc[-1]
+        buy_pdf = f'reports/SP500_Weekly_F2_buy_setups_{utility.get_date_mmddyyyy()}.pdf'
+        sell_pdf = f'reports/SP500_Weekly_F2_sell_setups_{utility.get_date_mmddyyyy()}.pdf'
+        # charts render in the background while the scan goes on
+        with ChartStream() as charts:
+            for ticker, data in self.stream_data_collection():
+                df = self.evaluate(ticker, self.scan_window(data))
+            
                 last_row = df.iloc[-1]
                 if last_row['Wick_Label'] == 'f2d': # f2d is a buy setup
                     # Pass ticker to save_buy_setup
                     tparams = SetupLogger.build_trade_params(last_row, ticker, 'StratF2D', buy = True)
                     self.log_buy_setup(tparams)
                     print(f'Buy setup: {ticker}')
-                    img = StratProcessor.plot_f2_setups(ticker, 'Buy', df)
-                    buy_pdf.savefig(img)
-                    plt.close(img)
+                    charts.add(buy_pdf, ChartJob(StratProcessor.plot_f2_setups, ticker, 'Buy', self.full_evaluation(ticker, data, df)))
                 elif last_row['Wick_Label'] == 'f2u': # f2u is a sell setup
                     # Pass ticker to save_sell_setup
                     tparams = SetupLogger.build_trade_params(last_row, ticker, 'StratF2U', buy = False)
                     self.log_sell_setup(tparams)
                     print(f'Sell setup: {ticker}')
-                    img = StratProcessor.plot_f2_setups(ticker, 'Sell', df)
-                    sell_pdf.savefig(img)
-                    plt.close(img)
+                    charts.add(sell_pdf, ChartJob(StratProcessor.plot_f2_setups, ticker, 'Sell', self.full_evaluation(ticker, data, df)))
+
+    # the wick label only looks at the last bar, but its StratSequence needs
+    # the bar types of the three bars before it
+    lookback = 4
 
+    def evaluate(self, ticker, df: pd.DataFrame):
+        return self.assign_strat_codes(df.copy())
 
     def assign_strat_codes(self, df: pd.DataFrame):
-        highs = df['High']
-        lows = df['Low']
-
-        df['Range'] = highs - lows
-        labels = []
-
-        for i in range(len(df)):
-            if i == 0:
-                labels.append(None)
-                continue
-
-            hi, lo = highs.iloc[i], lows.iloc[i]
-            hi_prev, lo_prev = highs.iloc[i-1], lows.iloc[i-1]
-
-            if hi < hi_prev and lo > lo_prev:
-                labels.append('1')
-            elif hi > hi_prev and lo < lo_prev:
-                labels.append('3')
-            elif hi > hi_prev and lo >= lo_prev:
-                labels.append('2u')
-            elif lo < lo_prev and hi <= hi_prev:
-                labels.append('2d')
-            else:
-                labels.append(None)
-
-        df['BarType'] = labels
-
-        # Build last 3 labels as concatenated string
-        sequences = []
-        for i in range(len(df)):
-            if i < 3:
-                sequences.append(None)
-            else:
-                seq = df['BarType'].iloc[i-2:i+1].tolist()
-                if None in seq:
-                    sequences.append(None)
-                else:
-                    sequences.append('_'.join(seq))
-        df['StratSequence'] = sequences
+        highs = df['High'].to_numpy(dtype=float)
+        lows = df['Low'].to_numpy(dtype=float)
+
+        df['Range'] = df['High'] - df['Low']
+
+        codes = self._bar_type_codes(highs, lows)
+        df['BarType'] = pd.Categorical.from_codes(codes - 1, dtype=BAR_TYPE_DTYPE)
+
+        # last 3 bar types as one integer, looked up into the joined label
+        seq = np.zeros(len(df), dtype=np.int16)
+        if len(df) > 3:
+            seq[3:] = codes[1:-2] * 25 + codes[2:-1] * 5 + codes[3:]
+        df['StratSequence'] = pd.Categorical.from_codes(SEQUENCE_CODES[seq], dtype=SEQUENCE_DTYPE)
 
         df = self._F2Setup_(df)
         df = self._combine_range_and_wick_labels_(df)
         
         return df
+
+    #================================================
+
+    @staticmethod
+    def _bar_type_codes(highs: np.ndarray, lows: np.ndarray):
+        """Returns BarType codes (index into BAR_TYPES) comparing every bar with the previous one."""
+        codes = np.zeros(len(highs), dtype=np.int8)
+        if len(highs) < 2:
+            return codes
+        hi, lo = highs[1:], lows[1:]
+        hi_prev, lo_prev = highs[:-1], lows[:-1]
+        conditions = [
+            (hi < hi_prev) & (lo > lo_prev),    # 1  - inside bar
+            (hi > hi_prev) & (lo < lo_prev),    # 3  - outside bar
+            (hi > hi_prev) & (lo >= lo_prev),   # 2u
+            (lo < lo_prev) & (hi <= hi_prev),   # 2d
+        ]
+        codes[1:] = np.select(conditions, [1, 2, 3, 4], default=0)
+        return codes
     
     #================================================
 
     def _combine_range_and_wick_labels_(self, df: pd.DataFrame):
-        def combine(row):
-            r, w = row['BarType'], row['Wick_Label']
-            if pd.notna(r) and r != '' and pd.notna(w) and w != '':
-                return f"{w}" # for wick label, it already includes bar_type info. so no need to add r.
-            elif pd.notna(r) and r != '':
-                return r
-            elif pd.notna(w) and w != '':
-                return w
-            else:
-                return None
-        df['Combo_Label'] = df.apply(combine, axis=1)
+        # wick label already includes bar_type info, so it wins over the bar type.
+        # Combo codes: f2d, f2u (wick codes - 1), then the bar types (bar type codes + 2)
+        wick = df['Wick_Label'].cat.codes.to_numpy()
+        bar_type = df['BarType'].cat.codes.to_numpy()
+        combo = np.where(wick > 0, wick - 1, np.where(bar_type >= 0, bar_type + 2, -1))
+        df['Combo_Label'] = pd.Categorical.from_codes(combo, dtype=COMBO_DTYPE)
         return df
 
     #================================================
 
     def _F2Setup_(self, df: pd.DataFrame):
-        o = df['Open']
-        h = df['High']
-        l = df['Low']
-        c = df['Close']
+        f2d, f2u = self._f2_masks(df['Open'], df['High'], df['Low'], df['Close'])
 
-        upper_wick = h - o.combine(c, max)
-        lower_wick = o.combine(c, min) - l
+        wick = np.zeros(len(df), dtype=np.int8)
+        wick[f2d.to_numpy()] = 1
+        wick[f2u.to_numpy()] = 2
+        df['Wick_Label'] = pd.Categorical.from_codes(wick, dtype=WICK_DTYPE)
+
+        return df
+
+    #================================================
+
+    @staticmethod
+    def _f2_masks(o, h, l, c):
+        """Returns (f2d, f2u) masks: small body with a dominant lower / upper wick."""
+        upper_wick = h - np.maximum(o, c)
+        lower_wick = np.minimum(o, c) - l
         body = abs(c - o)
         candle_height = h - l
 
-        df['Wick_Label'] = ''
-
         # Condition: body < 0.5 * height
         small_body_mask = body < (0.5 * candle_height)
 
-        df.loc[(lower_wick > upper_wick) & small_body_mask, 'Wick_Label'] = 'f2d'
-        df.loc[(upper_wick > lower_wick) & small_body_mask, 'Wick_Label'] = 'f2u'
+        return (lower_wick > upper_wick) & small_body_mask, (upper_wick > lower_wick) & small_body_mask
 
-        return df
+    #================================================
+
+    def scan_panel(self, panel: OHLCPanel):
+        # only the wick shape of the last bar decides the setup
+        f2d, f2u = self._f2_masks(panel.open[:, -1], panel.high[:, -1], panel.low[:, -1], panel.close[:, -1])
+        return panel.select(f2d), panel.select(f2u)
+
+    def signal_panel(self, panel: OHLCPanel):
+        with np.errstate(invalid='ignore'):
+            return self._f2_masks(panel.open, panel.high, panel.low, panel.close)
 
     #================================================
 
@@ -159,6 +174,7 @@ class StratProcessor:
     
     @staticmethod
     def plot_f2_setups(ticker: str, setup: str, df: pd.DataFrame):
+        import mplfinance as mpf
         plot_df = df[['Open', 'High', 'Low', 'Close']]
         title = f"{ticker} - weekly f2 setups. latest - {df['Wick_Label'].iloc[-1]} | {setup}."
         # Create the mplfinance figure and axes
@@ -202,6 +218,7 @@ class StratProcessor:
         
     @staticmethod
     def plot_with_wick_labels(ticker: str, df: pd.DataFrame):
+        import mplfinance as mpf
         plot_df = df[['Open', 'High', 'Low', 'Close']]
         title = f"{ticker} - weekly strat labels. combo - {df['StratSequence'].iloc[-1]}"
 
@@ -224,7 +241,7 @@ class StratProcessor:
         # Use position index for x and adjust y carefully
         for i, (timestamp, row) in enumerate(df.iterrows()):
             label = row.get('Combo_Label', None)
-            if label:
+            if isinstance(label, str):
                 y = row['High'] + (row['High'] - row['Low']) * 0.05  # ~5% above high
                 ax.text(
                     i, y,
@@ -242,6 +259,8 @@ class StratProcessor:
     #===========================================
     @staticmethod
     def process_strat_all(basedata: list):
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
         with PdfPages(f'reports/SP500_strat_reports_{utility.get_date_mmddyyyy()}.pdf') as pdf:
             for ticker, data in basedata:
                 df = data.copy()
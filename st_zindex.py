@@ -1,9 +1,10 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import mplfinance as mpf
-from matplotlib.backends.backend_pdf import PdfPages
 import utility
+import indicators
 from st_strategy_base import BaseStrategy
+from chart_renderer import ChartJob, ChartStream
+from ohlc_panel import OHLCPanel
 from setup_helper import *
 
 #===========================================
@@ -11,33 +12,30 @@ class ZIndex(BaseStrategy):
     def __str__(self):
         return "ZIndex"
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, *args, **kwargs):
+        # Only initialize once per singleton instance
+        if hasattr(self, '_dm_'):
+            return
+        super().__init__(*args, **kwargs)
         self.ema_span = 20
         self.z_threshold = 2
 
     def process_data(self):
-        basedata = self.fetch_data_collection()
-        with PdfPages(f'reports/SP500_Weekly_ZIndex_buy_setups_{utility.get_date_mmddyyyy()}.pdf') as buy_pdf, \
-             PdfPages(f'reports/SP500_Weekly_ZIndex_sell_setups_{utility.get_date_mmddyyyy()}.pdf') as sell_pdf:
-            for ticker, df in basedata:
-                df = self._calculate_zi_params(df)
-                df = self._detect_reversals(df)
+        buy_pdf = f'reports/SP500_Weekly_ZIndex_buy_setups_{utility.get_date_mmddyyyy()}.pdf'
+        sell_pdf = f'reports/SP500_Weekly_ZIndex_sell_setups_{utility.get_date_mmddyyyy()}.pdf'
+        # charts render in the background while the scan goes on
+        with ChartStream() as charts:
+            for ticker, data in self.stream_data_collection():
+                df = self.evaluate(ticker, self.scan_window(data))
                 last_row = df.iloc[-1]
                 if last_row['Bottom']:
                     tparams = SetupLogger.build_trade_params(last_row, ticker, 'ZIndex', buy = True)
                     self.log_buy_setup(tparams)
-
-                    img = self._plot_zi_chart(ticker, 'Buy', df)
-                    buy_pdf.savefig(img)
-                    plt.close(img)
+                    charts.add(buy_pdf, ChartJob(ZIndex._plot_zi_chart, ticker, 'Buy', self.full_evaluation(ticker, data, df)))
                 elif last_row['Top']:
                     tparams = SetupLogger.build_trade_params(last_row, ticker, 'ZIndex', buy = False)
                     self.log_sell_setup(tparams)
-
-                    img = self._plot_zi_chart(ticker, 'Sell', df)
-                    sell_pdf.savefig(img)
-                    plt.close(img)
+                    charts.add(sell_pdf, ChartJob(ZIndex._plot_zi_chart, ticker, 'Sell', self.full_evaluation(ticker, data, df)))
 
     def generate_reports(self):
         return super().generate_reports()
@@ -50,7 +48,40 @@ class ZIndex(BaseStrategy):
 
     #===========================================
 
-    def _plot_zi_chart(self, ticker: str, setup: str, df: pd.DataFrame):
+    def scan_panel(self, panel: OHLCPanel):
+        close = panel.close
+        ema5 = indicators.ema_2d(close, 5)[:, -1]
+        ema20 = indicators.ema_2d(close, self.ema_span)[:, -1]
+        # last value of the rolling std is the std of the last ema_span bars
+        if close.shape[1] >= self.ema_span:
+            std = np.std(close[:, -self.ema_span:], axis=1, ddof=1)
+        else:
+            std = np.full(len(panel), np.nan)
+        upper = ema20 + std * self.z_threshold
+        lower = ema20 - std * self.z_threshold
+
+        bottom = (panel.low[:, -1] < lower) & (close[:, -1] > ema5)
+        top = (panel.high[:, -1] > upper) & (close[:, -1] < ema5)
+        return panel.select(bottom), panel.select(top & ~bottom)
+
+    def signal_panel(self, panel: OHLCPanel):
+        close = panel.close
+        ema5 = indicators.ema_2d(close, 5)
+        ema20 = indicators.ema_2d(close, self.ema_span)
+        std = indicators.rolling_std_2d(close, self.ema_span)
+        upper = ema20 + std * self.z_threshold
+        lower = ema20 - std * self.z_threshold
+
+        with np.errstate(invalid='ignore'):
+            bottom = (panel.low < lower) & (close > ema5)
+            top = (panel.high > upper) & (close < ema5)
+        return bottom, top & ~bottom
+
+    #===========================================
+
+    @staticmethod
+    def _plot_zi_chart(ticker: str, setup: str, df: pd.DataFrame):
+        import mplfinance as mpf
         plot_df = df[['Open', 'High', 'Low', 'Close', 'EMA5', 'EMA20', 'Upper', 'Lower', 'Top', 'Bottom']]
         apds = [
             mpf.make_addplot(plot_df['EMA5'], color='blue', width=1),
@@ -92,6 +123,16 @@ class ZIndex(BaseStrategy):
     
     #===========================================
 
+    @property
+    def lookback(self):
+        # the EMAs are recursive: start early enough that the seed value no longer matters
+        return max(indicators.ema_warmup(self.ema_span), indicators.ema_warmup(5), self.ema_span)
+
+    def evaluate(self, ticker, df: pd.DataFrame):
+        return self._detect_reversals(self._calculate_zi_params(df, ticker))
+
+    #===========================================
+
     def _detect_reversals(self, df: pd.DataFrame):
         #print('detecting reversal')
         df['Top'] = (df['High'] > df['Upper']) & (df['Close'] < df['EMA5'])
@@ -100,13 +141,15 @@ class ZIndex(BaseStrategy):
 
     #===========================================
     
-    def _calculate_zi_params(self, df: pd.DataFrame):
+    def _calculate_zi_params(self, df: pd.DataFrame, ticker=None):
+        # indicators are shared with other strategies through the session cache
+        cache = indicators.indicator_cache
         df = df.copy()
-        df['EMA5'] = df['Close'].ewm(span=5, adjust=False).mean()       
-        df['EMA20'] = df['Close'].ewm(span=self.ema_span, adjust=False).mean() 
+        df['EMA5'] = cache.ema(ticker, df, 5)
+        df['EMA20'] = cache.ema(ticker, df, self.ema_span)
 
         df.dropna(inplace=True)
-        df['Rolling_Std'] = df['Close'].rolling(window=self.ema_span).std()
+        df['Rolling_Std'] = cache.rolling_std(ticker, df, self.ema_span)
         df['Upper'] = df['EMA20'] + (df['Rolling_Std'] * self.z_threshold)
         df['Lower'] = df['EMA20'] - (df['Rolling_Std'] * self.z_threshold)
 
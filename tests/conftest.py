@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# the modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from download_pool import SimulatedProvider
+from timeframes import span_start
+
+#===========================================
+
+class OfflineProvider(SimulatedProvider):
+    """
+    SimulatedProvider with a ticker list that honours span, and records
+    every request as (ticker, span, interval, start, end) in `requests`.
+    Tickers not in the list have no data.
+    `drop_dates` are left out of every ticker's bars (e.g. holidays).
+    """
+
+    def __init__(self, tickers=('AAA', 'BBB', 'CCC'), bars=3000, error_rate=0.0, seed=0, drop_dates=()):
+        super().__init__(latency=0.0, error_rate=error_rate, bars=bars, seed=seed)
+        self.tickers = list(tickers)
+        self.drop_dates = [pd.Timestamp(d).date() for d in drop_dates]
+        self.requests = []
+
+    def fetch_tickers(self):
+        return self.tickers
+
+    def fetch_historic_data(self, ticker, span="1y", interval="1d", start=None, end=None):
+        self.requests.append((ticker, span, interval, start, end))
+        if ticker not in self.tickers:
+            return pd.DataFrame()
+        df = super().fetch_historic_data(ticker, span=span, interval=interval, start=start, end=end)
+        if not start and span_start(span) is not None:
+            df = df[df.index >= span_start(span)]
+        if self.drop_dates:
+            df = df[~pd.Index(df.index.date).isin(self.drop_dates)]
+        return df
+
+@pytest.fixture
+def offline_provider():
+    return OfflineProvider
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Runs the test in an empty working directory with a data/ folder."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data")
+    os.makedirs("reports")
+    return tmp_path
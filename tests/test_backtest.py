@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import simulate_setups, NOT_TRIGGERED, TARGET, STOPPED, TIMED_OUT, OPEN
+from ohlc_panel import OHLCPanel
+
+#===========================================
+# simulate_setups on hand-built bars. The setup bar is always the first one,
+# high 11 / low 9: a buy enters at 11 with the stop at 9 and the target at 13
+# (risk 2); a sell enters at 9 with the stop at 11 and the target at 7.
+#===========================================
+
+SETUP = (10.0, 11.0, 9.0, 10.0)
+
+def make_panel(rows):
+    """rows: one list of (open, high, low, close) bars per ticker; shorter rows end early (NaN)."""
+    width = max(len(bars) for bars in rows)
+    arrays = np.full((4, len(rows), width), np.nan)
+    for i, bars in enumerate(rows):
+        arrays[:, i, :len(bars)] = np.array(bars, dtype=float).T
+    dates = pd.date_range("2024-01-01", periods=width, freq="B", tz="UTC")
+    return OHLCPanel([f"T{i}" for i in range(len(rows))], dates, *arrays, np.ones(arrays.shape[1:]))
+
+def simulate(bars, buy=True, entry_window=1, max_hold=3):
+    """Simulates the setup on the first bar of one ticker; returns that setup's results."""
+    panel = make_panel([[SETUP] + bars])
+    signal = np.zeros(panel.close.shape, dtype=bool)
+    signal[0, 0] = True
+    out = simulate_setups(panel, signal, buy, entry_window, max_hold)
+    assert len(out['row']) == 1
+    return {key: values[0] for key, values in out.items()}
+
+def check(result, outcome, entry, exit_price, held, risk=2.0):
+    assert result['outcome'] == outcome
+    assert result['held'] == held
+    if np.isnan(entry):
+        assert np.isnan(result['entry'])
+        return
+    assert result['entry'] == pytest.approx(entry)
+    if exit_price is None:
+        assert np.isnan(result['r'])
+    else:
+        assert result['r'] == pytest.approx((exit_price - entry) / risk)
+        assert result['ret'] == pytest.approx((exit_price - entry) / entry)
+
+#===========================================
+
+def test_not_triggered():
+    check(simulate([(10, 10.5, 9.5, 10), (10, 12, 9.5, 11)]), NOT_TRIGGERED, np.nan, None, 0)
+
+def test_target():
+    check(simulate([(10.5, 11.5, 10.2, 11.2), (11.2, 13.5, 11, 13)]), TARGET, 11, 13, 2)
+
+def test_gap_above_entry_fills_at_open():
+    check(simulate([(11.5, 12, 11.2, 11.8), (11.8, 13.5, 11.5, 13)]), TARGET, 11.5, 13, 2)
+
+def test_stop():
+    check(simulate([(10.5, 11.5, 10.2, 11.2), (11, 11.2, 8.9, 9.5)]), STOPPED, 11, 9, 2)
+
+def test_gap_through_stop_exits_at_open():
+    check(simulate([(10.5, 11.5, 10.2, 11.2), (8.5, 9.5, 8.2, 9)]), STOPPED, 11, 8.5, 2)
+
+def test_gap_through_target_exits_at_open():
+    check(simulate([(10.5, 11.5, 10.2, 11.2), (14, 14.5, 13.5, 14.2)]), TARGET, 11, 14, 2)
+
+def test_stop_wins_when_a_bar_touches_both():
+    check(simulate([(10.5, 11.5, 10.2, 11.2), (10, 13.5, 8.5, 12)]), STOPPED, 11, 9, 2)
+
+def test_stop_on_the_entry_bar():
+    check(simulate([(10.5, 11.2, 8.8, 9)]), STOPPED, 11, 9, 1)
+
+def test_target_on_the_entry_bar():
+    check(simulate([(10.5, 13.2, 10.2, 13)]), TARGET, 11, 13, 1)
+
+def test_timeout_exits_on_the_last_close():
+    bars = [(10.5, 11.5, 10.2, 11.2), (11.2, 12, 10.5, 11.5), (11.5, 12.5, 11, 12.2), (12.2, 14, 12, 13.8)]
+    check(simulate(bars, max_hold=3), TIMED_OUT, 11, 12.2, 3)
+
+def test_open_at_the_end_of_the_data():
+    bars = [(10.5, 11.5, 10.2, 11.2), (11.2, 12, 10.5, 11.5)]
+    check(simulate(bars, max_hold=3), OPEN, 11, None, 2)
+
+def test_entry_window():
+    bars = [(10, 10.5, 9.5, 10), (10.5, 11.5, 10.2, 11.2), (11.2, 13.5, 11, 13)]
+    check(simulate(bars, entry_window=1), NOT_TRIGGERED, np.nan, None, 0)
+    # held counts from the entry bar, not from the setup
+    check(simulate(bars, entry_window=2), TARGET, 11, 13, 2)
+
+def test_sell_target():
+    result = simulate([(9.5, 9.7, 8.5, 8.8), (8.8, 9, 6.8, 7)], buy=False)
+    assert result['outcome'] == TARGET and result['held'] == 2
+    assert result['entry'] == pytest.approx(9)
+    assert result['r'] == pytest.approx(1.0)
+    assert result['ret'] == pytest.approx(2 / 9)
+
+def test_sell_gap_through_stop():
+    result = simulate([(8.5, 9, 8.2, 8.8), (11.5, 12, 11.2, 11.8)], buy=False)
+    assert result['outcome'] == STOPPED and result['held'] == 2
+    assert result['entry'] == pytest.approx(8.5)
+    # r is measured against the planned risk of the setup bar, not the gap fill
+    assert result['r'] == pytest.approx((8.5 - 11.5) / 2)
+
+def test_setup_without_range_is_skipped():
+    panel = make_panel([[(10, 10, 10, 10), (10, 12, 9, 11)]])
+    signal = np.zeros(panel.close.shape, dtype=bool)
+    signal[0, 0] = True
+    assert len(simulate_setups(panel, signal, True)['row']) == 0
+
+def test_panel_of_setups_matches_single_setups():
+    """All the cases above at once, in rows of different lengths, give the same results."""
+    cases = [
+        [(10.5, 11.5, 10.2, 11.2), (11.2, 13.5, 11, 13)],
+        [(10.5, 11.5, 10.2, 11.2), (8.5, 9.5, 8.2, 9)],
+        [(10.5, 11.5, 10.2, 11.2), (10, 13.5, 8.5, 12)],
+        [(10.5, 11.5, 10.2, 11.2), (11.2, 12, 10.5, 11.5)],
+        [(10.5, 11.5, 10.2, 11.2), (11.2, 12, 10.5, 11.5), (11.5, 12.5, 11, 12.2), (12.2, 14, 12, 13.8)],
+    ]
+    panel = make_panel([[SETUP] + bars for bars in cases])
+    signal = np.zeros(panel.close.shape, dtype=bool)
+    signal[:, 0] = True
+    out = simulate_setups(panel, signal, True, 1, 3)
+    for i, bars in enumerate(cases):
+        single = simulate(bars)
+        for key in ('outcome', 'entry', 'r', 'ret', 'held'):
+            np.testing.assert_equal(out[key][i], single[key])
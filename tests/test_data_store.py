@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from data_store import LongOHLCStore
+from download_pool import synthetic_frame
+
+TICKERS = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE']
+
+#===========================================
+
+def frames(bars=50, end="2024-06-28"):
+    return [(ticker, synthetic_frame(ticker, bars, end=end)) for ticker in TICKERS]
+
+def check_round_trip(loaded, saved):
+    assert [ticker for ticker, _ in loaded] == [ticker for ticker, _ in saved]
+    for (_, df), (_, original) in zip(loaded, saved):
+        assert list(df.columns) == list(original.columns)
+        assert df['Volume'].dtype == np.int64
+        assert all(df[col].dtype == np.float64 for col in df.columns if col != 'Volume')
+        # the New York bars come back on the same instants, in UTC
+        assert str(df.index.tz) == 'UTC' and df.index.name == 'Date'
+        assert df.index.equals(original.index.tz_convert('UTC'))
+        pd.testing.assert_frame_equal(df, original.tz_convert('UTC'), check_freq=False, check_index_type=False)
+
+#===========================================
+
+def test_round_trip(tmp_path):
+    store = LongOHLCStore(str(tmp_path / "daily.db"))
+    saved = frames()
+    store.save(saved)
+    check_round_trip(store.load(), saved)
+    assert store.last_bars() == {ticker: df.index[-1].tz_convert('UTC') for ticker, df in saved}
+
+def test_round_trip_of_selected_tickers(tmp_path, monkeypatch):
+    # more tickers than fit in one "IN (...)" query
+    monkeypatch.setattr(LongOHLCStore, 'MAX_PARAMS', 2)
+    store = LongOHLCStore(str(tmp_path / "daily.db"))
+    saved = frames()
+    store.save(saved)
+    wanted = ['AAA', 'CCC', 'DDD', 'EEE', 'ZZZ']
+    check_round_trip(store.load(wanted), [(ticker, df) for ticker, df in saved if ticker in wanted])
+
+def test_save_replaces_a_ticker(tmp_path):
+    store = LongOHLCStore(str(tmp_path / "daily.db"))
+    store.save(frames(bars=50))
+    longer = frames(bars=60, end="2024-07-12")
+    store.save(longer[:1])
+    loaded = dict(store.load())
+    pd.testing.assert_frame_equal(loaded['AAA'], longer[0][1].tz_convert('UTC'),
+                                  check_freq=False, check_index_type=False)
+    assert len(loaded['BBB']) == 50
+
+def test_missing_columns_load_as_nan(tmp_path):
+    store = LongOHLCStore(str(tmp_path / "daily.db"))
+    df = synthetic_frame('AAA', 10, end="2024-06-28").drop(columns=['Dividends', 'Stock Splits'])
+    df['Volume'] = df['Volume'].astype('float64')
+    df.iloc[3, df.columns.get_loc('Volume')] = np.nan
+    store.save([('AAA', df)])
+    [(_, loaded)] = store.load()
+    assert loaded['Dividends'].isna().all() and loaded['Stock Splits'].isna().all()
+    assert loaded['Volume'].dtype == np.int64 and loaded['Volume'].iloc[3] == 0
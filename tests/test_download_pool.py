@@ -0,0 +1,59 @@
+import pytest
+
+from download_pool import ConcurrentDownloader, SimulatedProvider
+from providers import RateLimitError
+
+TICKERS = [f"T{i:02d}" for i in range(20)]
+
+#===========================================
+
+class BrokenTickers(SimulatedProvider):
+    """SimulatedProvider whose `broken` tickers always fail."""
+
+    def __init__(self, broken, **kwargs):
+        super().__init__(latency=0.0, error_rate=0.0, bars=20, **kwargs)
+        self.broken = set(broken)
+
+    def fetch_historic_data(self, ticker, span="1y", interval="1d", start=None, end=None):
+        if ticker in self.broken:
+            with self._lock:
+                self.calls += 1
+            raise RateLimitError(f"429 Too Many Requests for {ticker}")
+        return super().fetch_historic_data(ticker, span=span, interval=interval, start=start, end=end)
+
+def downloader(provider, max_retries):
+    # no backoff and no rate limit to speak of, so the retries cost nothing
+    return ConcurrentDownloader(provider, max_workers=4, requests_per_second=10_000,
+                                max_retries=max_retries, backoff_base=0.0)
+
+#===========================================
+
+def test_retries_recover_transient_errors():
+    provider = SimulatedProvider(latency=0.0, error_rate=0.3, bars=20, seed=1)
+    pool = downloader(provider, max_retries=10)
+    data = pool.download(TICKERS)
+    assert [ticker for ticker, _ in data] == TICKERS
+    assert all(len(df) == 20 for _, df in data)
+    assert provider.calls > len(TICKERS)
+    assert pool.failed == []
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_failures_are_reported(streaming):
+    provider = BrokenTickers(broken={"T03", "T11"})
+    pool = downloader(provider, max_retries=2)
+    if streaming:
+        data = list(pool.iter_download(TICKERS))
+    else:
+        data = pool.download(TICKERS)
+    assert sorted(ticker for ticker, _ in data) == [t for t in TICKERS if t not in ("T03", "T11")]
+    assert sorted(ticker for ticker, _ in pool.failed) == ["T03", "T11"]
+    assert all("429" in error for _, error in pool.failed)
+    # the first attempt plus max_retries for each broken ticker
+    assert provider.calls == len(TICKERS) + 2 * 2
+
+def test_failed_is_reset_per_download():
+    pool = downloader(BrokenTickers(broken={"T00"}), max_retries=0)
+    pool.download(TICKERS[:3])
+    assert [ticker for ticker, _ in pool.failed] == ["T00"]
+    pool.download(TICKERS[1:3])
+    assert pool.failed == []
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+#===========================================
+# The array kernels must match their pandas definitions, NaN padding included.
+#===========================================
+
+def panel(tickers=12, bars=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (tickers, bars)), axis=1))
+    # shorter histories are NaN padded at the front, plus a gap in one row
+    for i in range(0, tickers, 3):
+        close[i, :rng.integers(1, bars // 2)] = np.nan
+    close[1, 150:153] = np.nan
+    return close * 1.01, close * 0.99, close
+
+def reference_mean_deviation(values, window):
+    return pd.Series(values).rolling(window).apply(lambda x: np.abs(x - x.mean()).mean(), raw=True).to_numpy()
+
+@pytest.mark.parametrize('window', [1, 5, 20])
+def test_rolling_mean_deviation_matches_pandas(window):
+    _, _, close = panel()
+    result = indicators.rolling_mean_deviation_2d(close, window)
+    for row, values in zip(result, close):
+        np.testing.assert_allclose(row, reference_mean_deviation(values, window), rtol=1e-12, equal_nan=True)
+        np.testing.assert_allclose(indicators.rolling_mean_deviation(values, window), row, rtol=0, equal_nan=True)
+
+def test_rolling_mean_deviation_short_history():
+    assert np.isnan(indicators.rolling_mean_deviation_2d(np.ones((2, 4)), 5)).all()
+
+def test_cci_matches_pandas():
+    high, low, close = panel()
+    result = indicators.cci_2d(high, low, close, 20)
+    for i in range(len(close)):
+        typical = pd.Series((high[i] + low[i] + close[i]) / 3)
+        expected = (typical - typical.rolling(20).mean()) / (0.015 * reference_mean_deviation(typical, 20))
+        np.testing.assert_allclose(result[i], expected.to_numpy(), rtol=1e-9, equal_nan=True)
@@ -0,0 +1,87 @@
+import pandas as pd
+
+from data_manager import DataManager
+
+#===========================================
+# DataManager.get_prices_as_of: served from the local daily history, with a
+# network fallback for tickers the history does not reach back for.
+#===========================================
+
+def make_dm(provider):
+    """A DataManager with its local daily history loaded; the provider's requests are reset."""
+    dm = DataManager(provider=provider)
+    dm.get_daily_panel()
+    del provider.requests[:]
+    return dm
+
+def reference_bar(provider, ticker, date):
+    """The provider's last bar on or before the calendar day `date`."""
+    df = provider.fetch_historic_data(ticker, start="1990-01-01")
+    df = df[df.index.tz_localize(None).normalize() <= pd.Timestamp(date)]
+    return df.index[-1], df.iloc[-1]
+
+def assert_bar(prices, provider, ticker, date):
+    when, bar = reference_bar(provider, ticker, date)
+    row = prices.loc[ticker]
+    assert row['Date'] == when
+    for field in ('Close', 'High', 'Low'):
+        assert row[field] == bar[field]
+
+#===========================================
+
+def test_full_fallback_before_local_history(data_dir, offline_provider):
+    provider = offline_provider()
+    dm = make_dm(provider)
+    date = "2016-10-14"  # far older than the local 2y daily history
+    prices = dm.get_prices_as_of(date)
+    assert list(prices.index) == provider.tickers
+    assert str(prices['Date'].dtype).endswith(", UTC]")
+    for ticker in provider.tickers:
+        assert_bar(prices, provider, ticker, date)
+
+    closes = dict(dm.get_close_on_date(date))
+    assert closes['AAA'] == prices.loc['AAA', 'Close']
+
+def test_partial_fallback(data_dir, offline_provider):
+    class LateListing(offline_provider):
+        # AAA's span download only reaches back 100 bars, as for a recent listing
+        def fetch_historic_data(self, ticker, span="1y", interval="1d", start=None, end=None):
+            df = super().fetch_historic_data(ticker, span=span, interval=interval, start=start, end=end)
+            return df.iloc[-100:] if ticker == 'AAA' and not start else df
+
+    provider = LateListing()
+    dm = make_dm(provider)
+    date = (pd.Timestamp.today() - pd.DateOffset(years=1)).strftime('%Y-%m-%d')
+    prices = dm.get_prices_as_of(date, ['AAA', 'BBB', 'CCC'])
+    # only AAA is fetched, BBB and CCC come from the local history
+    assert {ticker for ticker, *_ in provider.requests} == {'AAA'}
+    for ticker in ('AAA', 'BBB', 'CCC'):
+        assert_bar(prices, provider, ticker, date)
+
+def test_unknown_ticker_stays_empty(data_dir, offline_provider):
+    dm = make_dm(offline_provider())
+    prices = dm.get_prices_as_of("2016-10-14", ['AAA', 'ZZZ'])
+    assert pd.isna(prices.loc['ZZZ', 'Date']) and pd.isna(prices.loc['ZZZ', 'Close'])
+    assert pd.notna(prices.loc['AAA', 'Close'])
+
+def test_weekend_and_holiday_fall_back_to_previous_session(data_dir, offline_provider):
+    today = pd.Timestamp.today().normalize()
+    # a Friday of last year that the provider treats as a holiday
+    holiday = today - pd.DateOffset(years=1)
+    holiday = holiday - pd.Timedelta(days=(holiday.weekday() - 4) % 7)
+    provider = offline_provider(drop_dates=[holiday])
+    dm = make_dm(provider)
+
+    sunday = holiday + pd.Timedelta(days=2)
+    for date in (holiday, sunday):
+        prices = dm.get_prices_as_of(date.strftime('%Y-%m-%d'), ['AAA', 'BBB'])
+        assert not provider.requests  # served locally
+        assert prices.loc['AAA', 'Date'].tz_convert('America/New_York').date() == (holiday - pd.Timedelta(days=1)).date()
+        for ticker in ('AAA', 'BBB'):
+            assert_bar(prices, provider, ticker, date)
+        del provider.requests[:]
+
+    # the same on the network fallback: 2020-03-15 is a Sunday
+    prices = dm.get_prices_as_of("2020-03-15", ['AAA'])
+    assert prices.loc['AAA', 'Date'].tz_convert('America/New_York').date() == pd.Timestamp("2020-03-13").date()
+    assert_bar(prices, provider, 'AAA', "2020-03-15")
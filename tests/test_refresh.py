@@ -0,0 +1,98 @@
+import pandas as pd
+
+from data_manager import DataManager
+
+#===========================================
+# Incremental refresh of the daily store: a second run only fetches the bars
+# from each ticker's last stored bar on, and replaces that bar.
+#===========================================
+
+def moving_provider(offline_provider):
+    class Moving(offline_provider):
+        """OfflineProvider whose history ends `lag` business days ago, with optional dividends."""
+        lag = 0
+        dividends = {}
+
+        def fetch_historic_data(self, ticker, span="1y", interval="1d", start=None, end=None):
+            df = super().fetch_historic_data(ticker, span=span, interval=interval, start=start, end=end)
+            if self.lag:
+                df = df.iloc[:-self.lag]
+            if ticker in self.dividends:
+                df = df.copy()
+                df.loc[df.index >= self.dividends[ticker], 'Dividends'] = 0.5
+            return df
+    return Moving()
+
+def run(provider):
+    """Loads the daily history as a fresh process would; returns ticker -> df and the requests made."""
+    del provider.requests[:]
+    dm = DataManager(provider=provider)
+    data = dict(dm.get_daily_data())
+    return dm, data, list(provider.requests)
+
+def expire(dm):
+    # pretend the last refresh was on an earlier day
+    dm._daily_store.set_meta('refreshed_on', '01012000')
+
+def full_history(provider, ticker):
+    return provider.fetch_historic_data(ticker, span=DataManager.HISTORY_SPAN)
+
+#===========================================
+
+def test_refresh_fetches_only_new_bars(data_dir, offline_provider):
+    provider = moving_provider(offline_provider)
+    provider.lag = 5
+    dm, first, requests = run(provider)
+    assert sorted(first) == provider.tickers
+    assert all(start is None for _, _, _, start, _ in requests)
+    last_bars = {ticker: df.index[-1] for ticker, df in first.items()}
+
+    expire(dm)
+    provider.lag = 0
+    dm, second, requests = run(provider)
+    # one request per ticker, starting on the day of its last stored bar
+    assert sorted(ticker for ticker, *_ in requests) == provider.tickers
+    for ticker, _, _, start, _ in requests:
+        assert start == last_bars[ticker].tz_convert('America/New_York').strftime('%Y-%m-%d')
+    for ticker, df in second.items():
+        expected = full_history(provider, ticker).tz_convert('UTC')
+        expected = expected[expected.index >= first[ticker].index[0]]
+        assert len(df) == len(first[ticker]) + 5
+        assert df.index.is_unique and df.index.is_monotonic_increasing
+        pd.testing.assert_frame_equal(df[['Open', 'High', 'Low', 'Close']],
+                                      expected[['Open', 'High', 'Low', 'Close']], check_freq=False)
+
+def test_refresh_replaces_the_last_stored_bar(data_dir, offline_provider):
+    provider = moving_provider(offline_provider)
+    dm, first, _ = run(provider)
+    # the stored last bar was still forming: its close changes by the next run
+    stored = dict(dm._daily_store.load())
+    stored['AAA'].iloc[-1, stored['AAA'].columns.get_loc('Close')] += 1.0
+    dm._daily_store.save([('AAA', stored['AAA'])])
+    expire(dm)
+
+    _, second, requests = run(provider)
+    assert len(requests) == len(provider.tickers)
+    assert second['AAA'].index.equals(first['AAA'].index)
+    assert second['AAA']['Close'].iloc[-1] == first['AAA']['Close'].iloc[-1]
+
+def test_refresh_same_day_fetches_nothing(data_dir, offline_provider):
+    provider = moving_provider(offline_provider)
+    run(provider)
+    _, _, requests = run(provider)
+    assert requests == []
+
+def test_corporate_action_refetches_full_history(data_dir, offline_provider):
+    provider = moving_provider(offline_provider)
+    provider.lag = 5
+    dm, first, _ = run(provider)
+
+    expire(dm)
+    provider.lag = 0
+    provider.dividends = {'BBB': first['BBB'].index[-1] + pd.Timedelta(days=1)}
+    _, second, requests = run(provider)
+    bbb = [start for ticker, _, _, start, _ in requests if ticker == 'BBB']
+    # the tail showed the dividend, so the adjusted history is fetched again in full
+    assert len(bbb) == 2 and bbb[0] is not None and bbb[1] is None
+    assert all(start is not None for ticker, _, _, start, _ in requests if ticker != 'BBB')
+    assert len(second['BBB']) == len(full_history(provider, 'BBB'))
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from download_pool import synthetic_frame
+from st_cci_bo import CCIBO
+from st_thestrat import TheStrat
+from st_zindex import ZIndex
+
+#===========================================
+# Scan mode evaluates only the strategy's lookback tail of every history;
+# the signal on the last bar must be the one of the full history.
+#===========================================
+
+TICKERS = 20
+BARS = 400
+ENDS = 15   # every history is cut at its last ENDS bars and at up to SIGNALS bars with a signal
+SIGNALS = 10
+
+def last_bar_signal(strategy, df):
+    """The values process_data decides on for the last bar."""
+    if isinstance(strategy, ZIndex):
+        last = df.iloc[-1]
+        return bool(last['Top']), bool(last['Bottom'])
+    if isinstance(strategy, CCIBO):
+        return tuple(df['Mode'].iloc[-2:])
+    last = df.iloc[-1]
+    return last['Wick_Label'], last['StratSequence'], last['Combo_Label']
+
+def signal_dates(strategy, evaluated):
+    """Dates of every bar the strategy fires on, from one full-history evaluation."""
+    if isinstance(strategy, ZIndex):
+        fired = evaluated['Top'] | evaluated['Bottom']
+    elif isinstance(strategy, CCIBO):
+        mode = evaluated['Mode']
+        fired = (mode != 'HOLD') & (mode != mode.shift())
+    else:
+        fired = evaluated['Wick_Label'] != ''
+    return evaluated.index[fired.to_numpy()]
+
+def histories(strategy, interval):
+    for i in range(TICKERS):
+        df = synthetic_frame(f"SCAN{i:02d}", BARS, interval, end="2024-12-30", seed=7)
+        ends = set(range(BARS - ENDS, BARS + 1))
+        dates = signal_dates(strategy, strategy.evaluate(None, df))
+        dates = dates[np.linspace(0, len(dates) - 1, min(len(dates), SIGNALS)).astype(int)]
+        ends.update(df.index.get_loc(date) + 1 for date in dates)
+        for end in sorted(ends):
+            if end > strategy.lookback:
+                yield df.iloc[:end]
+
+@pytest.fixture
+def scanning(monkeypatch):
+    """Returns the strategy singleton with scan_mode on; restored after the test."""
+    def make(strategy_cls):
+        monkeypatch.setattr(strategy_cls, 'scan_mode', True)
+        return strategy_cls()
+    return make
+
+@pytest.mark.parametrize('strategy_cls', [ZIndex, CCIBO, TheStrat])
+@pytest.mark.parametrize('interval', ['1d', '1wk'])
+def test_scan_mode_matches_full_history(strategy_cls, interval, scanning):
+    strat = scanning(strategy_cls)
+    assert strat.lookback is not None and strat.lookback < BARS - ENDS
+
+    fired = 0
+    for df in histories(strat, interval):
+        window = strat.scan_window(df)
+        assert len(window) == strat.lookback
+        # ticker=None bypasses the indicator cache
+        expected = last_bar_signal(strat, strat.evaluate(None, df))
+        assert last_bar_signal(strat, strat.evaluate(None, window)) == expected
+        fired += expected not in ((False, False), ('HOLD', 'HOLD')) and expected[0] != ''
+    assert fired > 0
+
+def test_scan_mode_indicator_values_match(scanning):
+    zi, cci = scanning(ZIndex), scanning(CCIBO)
+    for i in range(TICKERS):
+        df = synthetic_frame(f"SCAN{i:02d}", BARS, "1wk", end="2024-12-30", seed=7)
+        # CCIBO's EMA20 only feeds the chart, which is drawn from full_evaluation
+        for strat, columns in ((zi, ['EMA5', 'EMA20', 'Upper', 'Lower']), (cci, ['CCI', 'SMA_CCI'])):
+            window = strat.scan_window(df)
+            assert len(window) < len(df)
+            full = strat.evaluate(None, df)[columns].iloc[-1].to_numpy(dtype=float)
+            tail = strat.evaluate(None, window)[columns].iloc[-1].to_numpy(dtype=float)
+            np.testing.assert_allclose(tail, full, rtol=1e-7)
+
+def test_scan_window_keeps_short_histories(scanning):
+    strat = scanning(ZIndex)
+    df = synthetic_frame("SHORT", strat.lookback - 1, "1wk", end="2024-12-30", seed=7)
+    assert strat.scan_window(df) is df
+    evaluated = strat.evaluate(None, df)
+    assert strat.full_evaluation(None, df, evaluated) is evaluated
+
+@pytest.mark.parametrize('strategy_cls', [ZIndex, CCIBO, TheStrat])
+def test_full_history_without_scan_mode(strategy_cls):
+    strat = strategy_cls()
+    assert not strat.scan_mode
+    df = synthetic_frame("FULL", BARS, "1wk", end="2024-12-30", seed=7)
+    assert strat.scan_window(df) is df
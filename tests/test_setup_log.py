@@ -0,0 +1,49 @@
+import sqlite3
+import time
+
+import pytest
+
+from setup_helper import SetupLogger, TradeParams
+
+#===========================================
+
+@pytest.fixture
+def setup_log(tmp_path, monkeypatch):
+    SetupLogger.close()
+    monkeypatch.setattr(SetupLogger, 'DB_PATH', str(tmp_path / "setups.db"))
+    yield SetupLogger
+    SetupLogger.close()
+
+def setup(ticker):
+    return TradeParams("2024-01-02", ticker, "1D", 11.0, 9.0, 13.0, "test")
+
+def stored(path):
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute("SELECT ticker FROM buy_setups ORDER BY rowid")]
+
+#===========================================
+
+def test_timer_flushes_without_more_setups(setup_log, monkeypatch):
+    monkeypatch.setattr(SetupLogger, 'FLUSH_INTERVAL', 0.1)
+    setup_log.log_buy_setup(setup("AAA"))
+    assert stored(setup_log.DB_PATH) == []
+    deadline = time.monotonic() + 5
+    while not stored(setup_log.DB_PATH) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert stored(setup_log.DB_PATH) == ["AAA"]
+
+def test_size_flush(setup_log, monkeypatch):
+    monkeypatch.setattr(SetupLogger, 'FLUSH_SIZE', 2)
+    monkeypatch.setattr(SetupLogger, 'FLUSH_INTERVAL', 60)
+    setup_log.log_buy_setup(setup("AAA"))
+    assert stored(setup_log.DB_PATH) == []
+    setup_log.log_buy_setup(setup("BBB"))
+    assert stored(setup_log.DB_PATH) == ["AAA", "BBB"]
+    # the flush cancelled the pending timer
+    assert setup_log.session()._timer is None
+
+def test_close_flushes(setup_log, monkeypatch):
+    monkeypatch.setattr(SetupLogger, 'FLUSH_INTERVAL', 60)
+    setup_log.log_buy_setup(setup("AAA"))
+    setup_log.close()
+    assert stored(setup_log.DB_PATH) == ["AAA"]
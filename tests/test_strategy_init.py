@@ -0,0 +1,33 @@
+import pytest
+
+from st_strategy_base import BaseStrategy
+from st_strategy_factory import StrategyFactory
+from st_cci_bo import CCIBO
+from st_parabolic import Parabolic
+from st_thestrat import TheStrat
+from st_zindex import ZIndex
+
+#===========================================
+
+@pytest.fixture
+def fresh(monkeypatch):
+    """Drops the cached singletons for the test; the originals come back afterwards."""
+    monkeypatch.setattr(BaseStrategy, '_instances', {})
+
+@pytest.mark.parametrize("strategy_cls", [TheStrat, ZIndex, CCIBO, Parabolic])
+def test_strategies_accept_a_data_manager(fresh, strategy_cls):
+    dm = object()
+    strat = strategy_cls(dm=dm)
+    assert strat.dm is dm
+    # the singleton keeps the first data manager
+    assert strategy_cls(dm=object()).dm is dm
+
+def test_lookup_keeps_the_singleton_state(fresh):
+    strat = StrategyFactory.get_instance_by_description("parabolic")
+    strat._high_data["AAA"] = 1.0
+    assert StrategyFactory.get_instance_by_description("parabolic") is strat
+    assert strat._high_data == {"AAA": 1.0}
+
+    zindex = StrategyFactory.get_instance_by_description("ZIndex")
+    zindex.z_threshold = 3
+    assert StrategyFactory.get_instance_by_description("ZIndex").z_threshold == 3
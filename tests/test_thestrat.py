@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from download_pool import synthetic_frame
+from st_thestrat import TheStrat
+
+#===========================================
+# The vectorized TheStrat labels must match the original row-wise
+# implementation, kept here as the reference.
+#===========================================
+
+LABEL_COLUMNS = ['BarType', 'StratSequence', 'Wick_Label', 'Combo_Label']
+
+def reference_strat_codes(df: pd.DataFrame):
+    highs = df['High']
+    lows = df['Low']
+
+    df['Range'] = highs - lows
+    labels = []
+    for i in range(len(df)):
+        if i == 0:
+            labels.append(None)
+            continue
+
+        hi, lo = highs.iloc[i], lows.iloc[i]
+        hi_prev, lo_prev = highs.iloc[i-1], lows.iloc[i-1]
+
+        if hi < hi_prev and lo > lo_prev:
+            labels.append('1')
+        elif hi > hi_prev and lo < lo_prev:
+            labels.append('3')
+        elif hi > hi_prev and lo >= lo_prev:
+            labels.append('2u')
+        elif lo < lo_prev and hi <= hi_prev:
+            labels.append('2d')
+        else:
+            labels.append(None)
+    df['BarType'] = labels
+
+    # slices the list rather than df['BarType'], which turns None into NaN on pandas >= 3
+    sequences = []
+    for i in range(len(df)):
+        if i < 3:
+            sequences.append(None)
+        else:
+            seq = labels[i-2:i+1]
+            sequences.append(None if None in seq else '_'.join(seq))
+    df['StratSequence'] = sequences
+
+    o, h, l, c = df['Open'], df['High'], df['Low'], df['Close']
+    upper_wick = h - o.combine(c, max)
+    lower_wick = o.combine(c, min) - l
+    small_body_mask = abs(c - o) < (0.5 * (h - l))
+    df['Wick_Label'] = ''
+    df.loc[(lower_wick > upper_wick) & small_body_mask, 'Wick_Label'] = 'f2d'
+    df.loc[(upper_wick > lower_wick) & small_body_mask, 'Wick_Label'] = 'f2u'
+
+    def combine(row):
+        r, w = row['BarType'], row['Wick_Label']
+        if pd.notna(r) and r != '' and pd.notna(w) and w != '':
+            return w
+        elif pd.notna(r) and r != '':
+            return r
+        elif pd.notna(w) and w != '':
+            return w
+        return None
+    df['Combo_Label'] = df.apply(combine, axis=1) if len(df) else []
+    return df
+
+def as_objects(df):
+    """Label columns as plain objects with None for missing labels."""
+    labels = df[LABEL_COLUMNS].astype(object)
+    return labels.where(labels.notna(), None)
+
+#===========================================
+
+def frame_with_gaps(seed, bars=300):
+    """Synthetic bars with whole NaN bars, single NaN prices and repeated highs/lows."""
+    df = synthetic_frame(f"T{seed}", bars, "1wk", end="2024-12-30", seed=seed)
+    rng = np.random.default_rng(seed)
+    df.iloc[rng.choice(bars, bars // 20, replace=False), :4] = np.nan
+    for col in ['Open', 'High', 'Low', 'Close']:
+        df.iloc[rng.choice(bars, bars // 50, replace=False), df.columns.get_loc(col)] = np.nan
+    # rounded prices give equal highs/lows (unlabelled bars) and flat bodies
+    return df.round({'Open': 0, 'High': 0, 'Low': 0, 'Close': 0}) if seed % 2 else df
+
+@pytest.mark.parametrize('seed', range(8))
+def test_labels_match_row_wise_reference(seed):
+    df = synthetic_frame(f"T{seed}", 300, "1wk", end="2024-12-30", seed=seed)
+    expected = reference_strat_codes(df.copy())
+    result = TheStrat().assign_strat_codes(df.copy())
+    pd.testing.assert_frame_equal(as_objects(result), as_objects(expected))
+    pd.testing.assert_series_equal(result['Range'], expected['Range'])
+
+@pytest.mark.parametrize('seed', range(8))
+def test_labels_match_row_wise_reference_with_nan_bars(seed):
+    df = frame_with_gaps(seed)
+    expected = reference_strat_codes(df.copy())
+    result = TheStrat().assign_strat_codes(df.copy())
+    pd.testing.assert_frame_equal(as_objects(result), as_objects(expected))
+
+@pytest.mark.parametrize('bars', [0, 1, 2, 3, 4])
+def test_short_histories(bars):
+    df = synthetic_frame("SHORT", bars, "1wk", end="2024-12-30", seed=0)
+    expected = reference_strat_codes(df.copy())
+    result = TheStrat().assign_strat_codes(df.copy())
+    pd.testing.assert_frame_equal(as_objects(result), as_objects(expected))
@@ -0,0 +1,83 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_manager import DataManager
+from download_helper import DataDownloader
+from download_pool import synthetic_frame
+
+#===========================================
+# DataManager.get_yearly_stats persists completed years, but never the
+# tickers whose download failed: they are fetched again on the next call.
+#===========================================
+
+YEAR = 2023
+TICKERS = ['AAA', 'BBB', 'BAD']
+
+def year_frame(ticker):
+    df = synthetic_frame(ticker, 800, "1d", end="2024-06-28", seed=1)
+    return df[(df.index >= pd.Timestamp(f"{YEAR}-01-01", tz=df.index.tz)) &
+              (df.index < pd.Timestamp(f"{YEAR + 1}-01-01", tz=df.index.tz))]
+
+@pytest.fixture
+def fake_yfinance(monkeypatch, data_dir):
+    """yf.download stand-in: tickers in `broken` come back as all-NaN columns with a logged error."""
+    yf = pytest.importorskip("yfinance")
+    from yfinance import shared
+    state = {'broken': {'BAD'}, 'calls': []}
+
+    def download(tickers, **kwargs):
+        state['calls'].append(list(tickers))
+        shared._ERRORS.clear()
+        frames = {}
+        for ticker in tickers:
+            df = year_frame(ticker)
+            if ticker in state['broken']:
+                df = df * np.nan
+                shared._ERRORS[ticker] = "YFRateLimitError('Too Many Requests')"
+            frames[ticker] = df
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+
+    monkeypatch.setattr(yf, "download", download)
+    with open(os.path.join("data", "sp500_tickers.json"), 'w', encoding='utf-8') as f:
+        json.dump(TICKERS, f)
+    return state
+
+def test_yfinance_ticker_errors_are_reported_as_failed(fake_yfinance):
+    dd = DataDownloader()
+    data = dd.download_many(TICKERS, start=f"{YEAR}-01-01", end=f"{YEAR + 1}-01-01")
+    assert [ticker for ticker, _ in data] == ['AAA', 'BBB']
+    assert [ticker for ticker, _ in dd.failed] == ['BAD']
+    assert "Too Many Requests" in dd.failed[0][1]
+
+def test_failed_tickers_are_not_indexed(fake_yfinance):
+    stats = DataManager(provider=DataDownloader()).get_yearly_stats(YEAR)
+    assert stats['BAD'] == (None, None, None)
+    assert stats['AAA'][0] == pytest.approx(year_frame('AAA')['High'].max())
+
+    # the provider recovers: only BAD is fetched again and then indexed
+    fake_yfinance['broken'].clear()
+    fake_yfinance['calls'].clear()
+    stats = DataManager(provider=DataDownloader()).get_yearly_stats(YEAR)
+    assert fake_yfinance['calls'] == [['BAD']]
+    df = year_frame('BAD')
+    assert stats['BAD'] == pytest.approx((df['High'].max(), df['Low'].min(), df['Close'].iloc[-1]))
+
+    fake_yfinance['calls'].clear()
+    assert DataManager(provider=DataDownloader()).get_yearly_stats(YEAR) == stats
+    assert fake_yfinance['calls'] == []
+
+def test_failed_batches_are_not_indexed(data_dir, offline_provider):
+    class FlakyOnce(offline_provider):
+        def fetch_historic_data(self, ticker, span="1y", interval="1d", start=None, end=None):
+            if ticker == 'AAA' and not any(t == 'AAA' for t, *_ in self.requests):
+                self.requests.append((ticker, span, interval, start, end))
+                raise ConnectionError("connection reset")
+            return super().fetch_historic_data(ticker, span=span, interval=interval, start=start, end=end)
+
+    provider = FlakyOnce()
+    assert DataManager(provider=provider).get_yearly_stats(YEAR)['AAA'] == (None, None, None)
+    assert DataManager(provider=provider).get_yearly_stats(YEAR)['AAA'][0] is not None
@@ -0,0 +1,118 @@
+import re
+import numpy as np
+import pandas as pd
+
+#===========================================
+# Higher timeframe bars derived from daily bars.
+# Bars are built on the exchange calendar and labelled with the start of their
+# period (Monday, 1st of month, 1st of quarter at midnight New York time, in
+# UTC), the same way yfinance labels its 1wk/1mo/3mo bars.
+#===========================================
+
+EXCHANGE_TZ = 'America/New_York'
+
+# timeframe -> (resample rule, resample kwargs)
+TIMEFRAMES = {
+    'weekly': ('W-MON', {'label': 'left', 'closed': 'left'}),
+    'monthly': ('MS', {}),
+    'quarterly': ('QS', {}),
+}
+
+AGGREGATIONS = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+    'Dividends': 'sum',
+    'Stock Splits': 'prod',
+}
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+#===========================================
+
+def resample_ohlcv(daily, timeframe):
+    """
+    Aggregates daily OHLCV bars into weekly, monthly or quarterly bars.
+
+    Args:
+        daily (pd.DataFrame): Daily bars with a tz-aware DatetimeIndex.
+        timeframe (str): One of TIMEFRAMES.
+
+    Returns:
+        pd.DataFrame: One row per period that has at least one daily bar,
+                      indexed by the period start in UTC.
+    """
+    rule, kwargs = TIMEFRAMES[timeframe]
+    if daily.empty:
+        return daily.copy()
+
+    frame = daily.set_axis(daily.index.tz_convert(EXCHANGE_TZ))
+    if 'Stock Splits' in frame.columns:
+        # 0 means "no split"; multiply the ratios of the splits in the period
+        frame = frame.assign(**{'Stock Splits': frame['Stock Splits'].replace(0, 1)})
+
+    agg = {col: func for col, func in AGGREGATIONS.items() if col in frame.columns}
+    bars = frame.resample(rule, **kwargs).agg(agg).dropna(subset=['Open'])
+    if 'Stock Splits' in bars.columns:
+        bars['Stock Splits'] = bars['Stock Splits'].replace(1, 0)
+
+    bars.index = bars.index.tz_convert('UTC')
+    bars.index.name = 'Date'
+    return bars[[col for col in daily.columns if col in bars.columns]]
+
+#===========================================
+
+def update_resampled(cached, daily, timeframe):
+    """
+    Brings previously resampled bars up to date with new daily bars.
+
+    Only the last cached period (which may still have been forming) and the
+    periods after it are rebuilt. If the daily history no longer reproduces
+    the last complete cached bar, e.g. after a split or dividend re-adjusted
+    the prices, everything is rebuilt.
+
+    Args:
+        cached (pd.DataFrame or None): Bars from a previous resample.
+        daily (pd.DataFrame): The ticker's current daily bars.
+        timeframe (str): One of TIMEFRAMES.
+
+    Returns:
+        pd.DataFrame: The up to date bars.
+    """
+    if cached is None or cached.empty or daily.empty or daily.index[0] > cached.index[-1]:
+        return resample_ohlcv(daily, timeframe)
+
+    splice = cached.index[-1]
+    if len(cached) > 1:
+        prev = cached.index[-2]
+        check = resample_ohlcv(daily[(daily.index >= prev) & (daily.index < splice)], timeframe)
+        if (check.empty or check.index[-1] != prev
+                or not np.allclose(check[PRICE_COLUMNS].iloc[-1].to_numpy(dtype=np.float64),
+                                   cached[PRICE_COLUMNS].iloc[-2].to_numpy(dtype=np.float64),
+                                   rtol=1e-9, equal_nan=True)):
+            return resample_ohlcv(daily, timeframe)
+
+    tail = resample_ohlcv(daily[daily.index >= splice], timeframe)
+    return pd.concat([cached[cached.index < splice], tail[cached.columns.intersection(tail.columns)]])
+
+#===========================================
+
+def span_start(span, now=None):
+    """
+    Returns the UTC timestamp a yfinance style span ('2y', '6mo', '4wk', '5d')
+    reaches back to, or None for 'max' / None.
+    """
+    if span in (None, 'max'):
+        return None
+    match = re.fullmatch(r'(\d+)(y|mo|wk|d)', span)
+    if not match:
+        raise ValueError(f"Unsupported span: {span}")
+    count, unit = int(match.group(1)), match.group(2)
+    offset = {'y': pd.DateOffset(years=count), 'mo': pd.DateOffset(months=count),
+              'wk': pd.DateOffset(weeks=count), 'd': pd.DateOffset(days=count)}[unit]
+    now = now if now is not None else pd.Timestamp.now(tz='UTC')
+    return now.normalize() - offset
+
+#===========================================